@@ -0,0 +1,126 @@
+"""Параллельные регистрации: SELECT + INSERT против INSERT ... ON CONFLICT.
+
+Нужна база PostgreSQL из настроек AuthService. Таблицы создаются в отдельной
+схеме bench_registration, которая удаляется после замера, данные сервиса
+не затрагиваются. Хэширование пароля не входит в замер.
+
+Запуск из каталога AuthService:
+
+    python benchmarks/bench_registration.py --signups 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi import HTTPException  # noqa: E402
+from sqlalchemy import select, text  # noqa: E402
+from sqlalchemy.exc import IntegrityError  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from src.authservice.auth import insert_user  # noqa: E402
+from src.authservice.models import User  # noqa: E402
+from src.authservice.settings import settings  # noqa: E402
+
+SCHEMA = "bench_registration"
+HASHED_PASSWORD = "$argon2id$v=19$m=65536,t=3,p=4$benchmark"
+
+
+async def select_then_insert(db, username: str, email: str):
+    """Прежний путь регистрации: проверка, затем вставка."""
+    result = await db.execute(
+        select(User).where((User.username == username) | (User.email == email))
+    )
+    existing = result.scalar_one_or_none()
+    if existing:
+        if existing.username == username:
+            raise HTTPException(status_code=400, detail="Username already taken")
+        raise HTTPException(status_code=400, detail="Email already taken")
+
+    user = User(username=username, email=email, hashed_password=HASHED_PASSWORD)
+    db.add(user)
+    await db.flush()
+    return user
+
+
+async def on_conflict(db, username: str, email: str):
+    return await insert_user(db, username, email, HASHED_PASSWORD)
+
+
+def make_signups(count: int, duplicate_ratio: float) -> list[tuple[str, str]]:
+    """Часть регистраций повторяет username или email одной из предыдущих."""
+    signups = []
+    every = max(2, round(1 / duplicate_ratio)) if duplicate_ratio else 0
+    for i in range(count):
+        if every and i and i % every == 0:
+            # i - 1 никогда не кратно every, значит это обычная регистрация
+            base = i - 1
+            if i % (2 * every) == 0:
+                signups.append((f"user{base:07d}", f"other{i:07d}@example.com"))
+            else:
+                signups.append((f"other{i:07d}", f"user{base:07d}@example.com"))
+        else:
+            signups.append((f"user{i:07d}", f"user{i:07d}@example.com"))
+    return signups
+
+
+async def run(label: str, register, sessionmaker, signups, concurrency: int):
+    outcomes = Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(username: str, email: str):
+        async with semaphore, sessionmaker() as db:
+            try:
+                await register(db, username, email)
+                await db.commit()
+                outcomes["created"] += 1
+            except HTTPException as e:
+                outcomes[e.detail] += 1
+            except IntegrityError:
+                # гонка: проверка прошла, вставка упала - клиент получил бы 500
+                outcomes["500 (unique violation)"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(username, email) for username, email in signups))
+    elapsed = time.perf_counter() - started
+
+    print(f"{label}: {len(signups) / elapsed:8.0f} signups/s, {elapsed:.2f} s")
+    for outcome, count in sorted(outcomes.items()):
+        print(f"    {outcome:<28} {count}")
+    return outcomes
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--signups", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duplicates", type=float, default=0.2, help="доля регистраций с занятыми данными")
+    args = parser.parse_args()
+
+    engine = create_async_engine(settings.DATABASE_URL_asyncpg, pool_size=args.concurrency)
+    bench_engine = engine.execution_options(schema_translate_map={None: SCHEMA})
+    sessionmaker = async_sessionmaker(bind=bench_engine, expire_on_commit=False)
+    signups = make_signups(args.signups, args.duplicates)
+    # одновременные регистрации с одинаковыми данными - то, на чём ломается проверка
+    racing = [signup for signup in signups[: args.concurrency] for _ in range(2)]
+
+    try:
+        for label, register in (("SELECT + INSERT", select_then_insert), ("INSERT ON CONFLICT", on_conflict)):
+            for workload, data in (("", signups), (", гонка", racing)):
+                async with bench_engine.begin() as conn:
+                    await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+                    await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+                    await conn.run_sync(lambda sync_conn: User.__table__.create(sync_conn))
+                await run(label + workload, register, sessionmaker, data, args.concurrency)
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
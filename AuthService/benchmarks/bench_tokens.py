@@ -0,0 +1,70 @@
+"""Скорость выпуска и проверки JWT: PEM на каждый вызов против разобранных ключей.
+
+Ключи генерируются на время замера. Запуск из каталога AuthService
+(нужны те же переменные окружения, что и для сервиса):
+
+    python benchmarks/bench_tokens.py
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from cryptography.hazmat.primitives import serialization  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import ec, rsa  # noqa: E402
+from jose import jwt  # noqa: E402
+
+from src.authservice.keys import JwtKey, KeyRing  # noqa: E402
+
+N = 2_000
+PAYLOAD = {"username": "benchmark", "user_id": 1, "exp": "4102444800", "type": "access"}
+
+
+def pem_pair(private_key) -> tuple[str, str]:
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    ).decode()
+    return private_pem, public_pem
+
+
+def rate(label: str, func, n: int = N) -> float:
+    started = time.perf_counter()
+    for _ in range(n):
+        func()
+    per_second = n / (time.perf_counter() - started)
+    print(f"{label:<36} {per_second:10.0f} tokens/s")
+    return per_second
+
+
+def main():
+    rsa_private, rsa_public = pem_pair(rsa.generate_private_key(public_exponent=65537, key_size=2048))
+    ec_private, _ = pem_pair(ec.generate_private_key(ec.SECP256R1()))
+
+    rsa_ring = KeyRing(JwtKey(rsa_private, "RS256"))
+    ec_ring = KeyRing(JwtKey(ec_private, "ES256"))
+    rsa_token = rsa_ring.sign(PAYLOAD)
+    ec_token = ec_ring.sign(PAYLOAD)
+
+    print("выпуск")
+    # разбор закрытого ключа RSA занимает десятки миллисекунд, поэтому вызовов меньше
+    before = rate("RS256, PEM на каждый вызов", lambda: jwt.encode(PAYLOAD, rsa_private, algorithm="RS256"), N // 40)
+    after = rate("RS256, разобранный ключ", lambda: rsa_ring.sign(PAYLOAD))
+    es = rate("ES256, разобранный ключ", lambda: ec_ring.sign(PAYLOAD))
+    print(f"ускорение RS256: x{after / before:.1f}, ES256: x{es / before:.1f}\n")
+
+    print("проверка")
+    before = rate("RS256, PEM на каждый вызов", lambda: jwt.decode(rsa_token, rsa_public, algorithms=["RS256"]))
+    after = rate("RS256, разобранный ключ", lambda: rsa_ring.verify(rsa_token))
+    es = rate("ES256, разобранный ключ", lambda: ec_ring.verify(ec_token))
+    print(f"ускорение RS256: x{after / before:.1f}, ES256: x{es / before:.1f}")
+
+
+if __name__ == "__main__":
+    main()
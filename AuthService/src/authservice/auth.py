@@ -1,18 +1,24 @@
+import asyncio
+import logging
 from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from sqlalchemy import select
+from sqlalchemy import or_, select, update
+from sqlalchemy.dialects.postgresql import insert
 
+from .database import sessionmaker
+from .keys import key_ring
 from .models import User
-from .security import verify_password
+from .security import hash_password, hashing_engine, needs_rehash, verify_password
 from .settings import settings
+from .throttle import login_throttle
+from .token_versions import version_cache, version_cache_lookups
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
+logger = logging.getLogger(__name__)
 
-JWT_PRIVATE_KEY = settings.JWT_PRIVATE_KEY
-JWT_PUBLIC_KEY = settings.JWT_PUBLIC_KEY
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
 ACCESS_TOKEN_EXPIRETIME = timedelta(minutes=15)
 REFRESH_TOKEN_EXPIRETIME = timedelta(days=7)
@@ -28,9 +34,7 @@ async def create_access_token(data: dict) -> str:
         "type": "access",
     }
 
-    acces_token = jwt.encode(
-        payload, key=JWT_PRIVATE_KEY, algorithm=settings.JWT_ALGORITHM
-    )
+    acces_token = key_ring.sign(payload)
 
     return acces_token
 
@@ -48,43 +52,149 @@ async def create_refresh_token(data: dict, db) -> str:
         "refresh_token_version": data["refresh_token_version"],
     }
 
-    refresh_token = jwt.encode(
-        payload, key=JWT_PRIVATE_KEY, algorithm=settings.JWT_ALGORITHM
-    )
+    refresh_token = key_ring.sign(payload)
 
     return refresh_token
 
 
-async def validate_refresh_token(token: str, db):
+class TokenOwner(NamedTuple):
+    id: int
+    username: str
+    refresh_token_version: int
+
+
+async def validate_refresh_token(token: str, db) -> TokenOwner:
     data = await decode_token(token)
     if data == None or data["type"] != "refresh":
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = await db.get(User, data["user_id"])
+    user_id = data["user_id"]
+    version = await version_cache.get(user_id)
+    if version is not None:
+        version_cache_lookups.inc(result="hit")
+    else:
+        version_cache_lookups.inc(result="miss")
+        version = await db.scalar(
+            select(User.refresh_token_version).where(User.id == user_id)
+        )
+        if version is None:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        await version_cache.fill(user_id, version)
 
-    if user.refresh_token_version != data["refresh_token_version"]:
+    if version != data["refresh_token_version"]:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    return user
+    return TokenOwner(user_id, data["username"], version)
 
 
-async def decode_token(token: str) -> dict | None:
-    try:
-        return jwt.decode(token, JWT_PUBLIC_KEY, algorithms=[settings.JWT_ALGORITHM])
-    except JWTError:
+async def revoke_refresh_tokens(user_id: int, db) -> int | None:
+    """Увеличивает версию refresh-токенов пользователя, возвращает новую.
+
+    Кэш обновляется сразу после коммита, поэтому старые refresh-токены
+    перестают приниматься без ожидания TTL.
+    """
+    version = await db.scalar(
+        update(User)
+        .where(User.id == user_id)
+        .values(refresh_token_version=User.refresh_token_version + 1)
+        .returning(User.refresh_token_version)
+    )
+    if version is None:
         return None
+    await db.commit()
+    await version_cache.set(user_id, version)
+    return version
+
+
+async def decode_token(token: str) -> dict | None:
+    return key_ring.verify(token)
+
 
+async def insert_user(db, username: str, email: str, hashed_password: str):
+    """Создаёт пользователя одним запросом INSERT ... ON CONFLICT DO NOTHING.
+
+    Уникальность username и email проверяет сама база, поэтому параллельные
+    регистрации с одинаковыми данными не проходят обе. Только при конфликте
+    делается второй запрос, чтобы понять, что именно занято.
+    """
+    result = await db.execute(
+        insert(User)
+        .values(username=username, email=email, hashed_password=hashed_password)
+        .on_conflict_do_nothing()
+        .returning(User.id, User.username, User.email)
+    )
+    created = result.one_or_none()
+    if created is not None:
+        return created
+
+    taken = await db.scalar(
+        select(User.username)
+        .where(or_(User.username == username, User.email == email))
+        .limit(1)
+    )
+    if taken is None:
+        # конфликтующую запись успели удалить
+        raise HTTPException(status_code=400, detail="User already exists")
+    if taken == username:
+        raise HTTPException(status_code=400, detail="Username already taken")
+    raise HTTPException(status_code=400, detail="Email already taken")
+
+
+async def authuser(username, password, db, client_ip: str | None = None):
+    throttled = settings.LOGIN_THROTTLE_ENABLED
+    if throttled:
+        # до запроса в базу и argon2
+        await login_throttle.check(username, client_ip)
 
-async def authuser(username, password, db):
     result = await db.execute(select(User).where(username == User.username))
     user = result.scalar()
 
     if not user or not await verify_password(password, user.hashed_password):
+        if throttled:
+            await login_throttle.failure(username, client_ip)
         raise HTTPException(status_code=400, detail="Invalid credentials")
 
+    if throttled:
+        await login_throttle.success(username)
+
+    if needs_rehash(user.hashed_password):
+        schedule_rehash(user.id, password, user.hashed_password)
+
     return user
 
 
+# ссылки на фоновые задачи, чтобы их не собрал сборщик мусора
+_background_tasks: set[asyncio.Task] = set()
+
+
+def schedule_rehash(user_id: int, password: str, old_hash: str):
+    """Пересчитывает хэш пароля с текущими параметрами argon2 после входа.
+
+    Не запускается, если пул хэширования занят больше чем наполовину:
+    миграция подождёт до следующего входа, логины важнее.
+    """
+    if hashing_engine.pending * 2 >= hashing_engine.max_pending:
+        return
+    task = asyncio.create_task(_rehash(user_id, password, old_hash))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _rehash(user_id: int, password: str, old_hash: str):
+    try:
+        new_hash = await hash_password(password)
+        async with sessionmaker() as db:
+            # пароль мог смениться, пока считался хэш
+            await db.execute(
+                update(User)
+                .where(User.id == user_id, User.hashed_password == old_hash)
+                .values(hashed_password=new_hash)
+            )
+            await db.commit()
+    except Exception:
+        logger.exception("Password rehash failed for user %s", user_id)
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
 ):
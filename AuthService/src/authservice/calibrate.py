@@ -0,0 +1,91 @@
+"""Подбор параметров argon2 под железо сервера.
+
+Ищет самую большую память, при которой хэш укладывается в целевое время,
+затем добирает число итераций до этого времени (рекомендация RFC 9106:
+сначала память, потом время). Результат печатается или записывается в .env:
+
+    python -m src.authservice.calibrate --target-ms 250 --write
+"""
+import argparse
+import os
+import statistics
+import time
+from pathlib import Path
+
+from argon2 import PasswordHasher
+
+# KiB; 19 MiB - минимум по рекомендации OWASP
+MEMORY_CANDIDATES = (262144, 131072, 65536, 47104, 32768, 19456)
+SAMPLE_PASSWORD = "calibration-password"
+
+
+def measure_ms(time_cost: int, memory_cost: int, parallelism: int, rounds: int) -> float:
+    hasher = PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        hasher.hash(SAMPLE_PASSWORD)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def calibrate(target_ms: float, parallelism: int, rounds: int, max_time_cost: int = 10) -> dict:
+    for memory_cost in MEMORY_CANDIDATES:
+        base_elapsed = measure_ms(1, memory_cost, parallelism, rounds)
+        print(f"memory={memory_cost} KiB time=1: {base_elapsed:.1f} ms")
+        if base_elapsed > target_ms:
+            continue
+
+        time_cost = max(1, min(max_time_cost, int(target_ms // base_elapsed)))
+        # время, замеренное именно для возвращаемого time_cost
+        elapsed = base_elapsed
+        while time_cost > 1:
+            elapsed = measure_ms(time_cost, memory_cost, parallelism, rounds)
+            print(f"memory={memory_cost} KiB time={time_cost}: {elapsed:.1f} ms")
+            if elapsed <= target_ms:
+                break
+            time_cost -= 1
+            elapsed = base_elapsed
+
+        return {
+            "ARGON2_TIME_COST": time_cost,
+            "ARGON2_MEMORY_COST": memory_cost,
+            "ARGON2_PARALLELISM": parallelism,
+            "measured_ms": round(elapsed, 1),
+        }
+
+    raise SystemExit(
+        f"Even the smallest parameter set is slower than {target_ms} ms, raise --target-ms"
+    )
+
+
+def write_env(env_file: Path, values: dict):
+    """Обновляет ARGON2_* в env-файле, остальные строки не трогает."""
+    lines = env_file.read_text().splitlines() if env_file.exists() else []
+    lines = [line for line in lines if line.split("=", 1)[0].strip() not in values]
+    lines += [f"{key}={value}" for key, value in values.items()]
+    env_file.write_text("\n".join(lines) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target-ms", type=float, default=250.0, help="целевое время одного хэша")
+    parser.add_argument("--parallelism", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--rounds", type=int, default=5, help="замеров на каждый набор параметров")
+    parser.add_argument("--env-file", type=Path, default=Path(".env"))
+    parser.add_argument("--write", action="store_true", help="записать параметры в env-файл")
+    args = parser.parse_args()
+
+    result = calibrate(args.target_ms, args.parallelism, args.rounds)
+    measured = result.pop("measured_ms")
+    print(f"\nselected ({measured} ms per hash):")
+    for key, value in result.items():
+        print(f"{key}={value}")
+
+    if args.write:
+        write_env(args.env_file, result)
+        print(f"written to {args.env_file}")
+
+
+if __name__ == "__main__":
+    main()
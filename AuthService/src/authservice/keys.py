@@ -0,0 +1,87 @@
+import base64
+import hashlib
+import json
+from pathlib import Path
+
+from jose import JWTError, jwk, jwt
+from jose.backends.base import Key
+
+from .settings import settings
+
+# обязательные поля JWK для отпечатка по RFC 7638
+_THUMBPRINT_MEMBERS = {"RSA": ("e", "kty", "n"), "EC": ("crv", "kty", "x", "y")}
+
+
+def thumbprint(public_jwk: dict) -> str:
+    members = {name: public_jwk[name] for name in _THUMBPRINT_MEMBERS[public_jwk["kty"]]}
+    digest = hashlib.sha256(json.dumps(members, separators=(",", ":"), sort_keys=True).encode()).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+class JwtKey:
+    """Ключ, разобранный из PEM один раз, и его идентификатор (kid)."""
+
+    def __init__(self, pem: str, algorithm: str, kid: str = ""):
+        self.algorithm = algorithm
+        self.key: Key = jwk.construct(pem, algorithm)
+        self.public_key: Key = self.key.public_key()
+        self._public_jwk = {
+            name: value.decode() if isinstance(value, bytes) else value
+            for name, value in self.public_key.to_dict().items()
+        }
+        self.kid = kid or thumbprint(self._public_jwk)
+
+    def public_jwk(self) -> dict:
+        return {**self._public_jwk, "kid": self.kid, "use": "sig"}
+
+
+class KeyRing:
+    """Ключ подписи и все ключи, которыми принимаются токены.
+
+    Токены подписываются текущим ключом с заголовком kid. Проверка выбирает
+    ключ по kid, поэтому во время ротации старые токены продолжают
+    приниматься, пока их ключ есть в JWT_VERIFY_KEYS. Токены без kid
+    (выпущенные до появления заголовка) проверяются текущим ключом.
+    """
+
+    def __init__(self, signing_key: JwtKey, verify_keys: list[JwtKey] = ()):
+        self.signing_key = signing_key
+        self.verify_keys = {signing_key.kid: signing_key}
+        for key in verify_keys:
+            self.verify_keys.setdefault(key.kid, key)
+
+    def sign(self, payload: dict) -> str:
+        return jwt.encode(
+            payload,
+            key=self.signing_key.key,
+            algorithm=self.signing_key.algorithm,
+            headers={"kid": self.signing_key.kid},
+        )
+
+    def verify(self, token: str) -> dict | None:
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except JWTError:
+            return None
+        key = self.verify_keys.get(kid) if kid else self.signing_key
+        if key is None:
+            return None
+        try:
+            return jwt.decode(token, key.public_key, algorithms=[key.algorithm])
+        except JWTError:
+            return None
+
+    def jwks(self) -> dict:
+        return {"keys": [key.public_jwk() for key in self.verify_keys.values()]}
+
+
+def load_key_ring() -> KeyRing:
+    signing_key = JwtKey(settings.JWT_PRIVATE_KEY, settings.JWT_ALGORITHM, settings.JWT_KEY_ID)
+    verify_keys = [
+        JwtKey(Path(entry["path"]).read_text(), entry.get("alg", settings.JWT_ALGORITHM), entry.get("kid", ""))
+        for entry in settings.JWT_VERIFY_KEYS
+    ]
+    return KeyRing(signing_key, verify_keys)
+
+
+key_ring = load_key_ring()
@@ -1,26 +1,50 @@
+import ipaddress
+import logging
 from contextlib import asynccontextmanager
 
-from fastapi import Depends, FastAPI, Form, HTTPException
+from fastapi import Depends, FastAPI, Form, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .auth import (
     authuser,
     create_access_token,
     create_refresh_token,
+    insert_user,
+    revoke_refresh_tokens,
     validate_refresh_token,
 )
 from .database import engine, get_session
-from .models import User
-from .rabbitmq.producer_user_auth import send_message_to_userservice
+from .keys import key_ring
+from .metrics import registry
+from .models import OutboxEvent
+from .outbox import outbox_relay
+from .rabbitmq.producer_user_auth import RBPUserAuth
 from .schemas import LogoutResponse, RegistrationScheme, TokenScheme, UserRead
-from .security import hash_password
+from .security import hash_password, hashing_engine
+from .settings import settings
+from .throttle import failure_store
+from .token_versions import version_cache
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    await hashing_engine.warmup()
+    try:
+        await RBPUserAuth.connect()
+    except Exception:
+        # брокер может подняться позже, издатель подключится при первой публикации
+        logger.warning("RabbitMQ is unavailable, publisher will connect on first message")
+    outbox_relay.start()
     yield
+    await outbox_relay.close()
+    await RBPUserAuth.close()
+    await version_cache.close()
+    await failure_store.close()
+    hashing_engine.close()
     await engine.dispose()
 
 
@@ -31,42 +55,53 @@ app = FastAPI(lifespan=lifespan)
 async def create_user(
     user: RegistrationScheme, db: AsyncSession = Depends(get_session)
 ):
-    result = await db.execute(
-        select(User).where(
-            (User.username == user.username) | (User.email == user.email)
-        )
-    )
-    existing = result.scalar_one_or_none()
-
-    if existing:
-        if str(existing.username) == str(user.username):
-            raise HTTPException(status_code=400, detail="Username already taken")
-        else:
-            raise HTTPException(status_code=400, detail="Email already taken")
-
-    new_user = User(
+    new_user = await insert_user(
+        db,
         username=user.username,
         email=user.email,
         hashed_password=await hash_password(user.password),
     )
 
-    db.add(new_user)
-
-    await db.commit()
-    await db.refresh(new_user)
+    # событие для UserService пишется в той же транзакции, что и пользователь,
+    # и отправляется в брокер фоновым relay
     user_to_add = user.dict(exclude={"password", "email"})
     user_to_add["id"] = new_user.id
-    await send_message_to_userservice(user_to_add)
+    db.add(OutboxEvent(queue=RBPUserAuth.queue_name, payload=user_to_add))
+
+    await db.commit()
+    outbox_relay.notify()
 
     return new_user
 
 
+TRUSTED_PROXIES = [ipaddress.ip_network(proxy, strict=False) for proxy in settings.LOGIN_THROTTLE_TRUSTED_PROXIES]
+
+
+def is_trusted_proxy(host: str | None) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except (TypeError, ValueError):
+        return False
+    return any(address in network for network in TRUSTED_PROXIES)
+
+
+def client_ip(request: Request) -> str | None:
+    peer = request.client.host if request.client else None
+    if settings.LOGIN_THROTTLE_TRUST_FORWARDED and is_trusted_proxy(peer):
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            # последний адрес дописал gateway, левее - то, что прислал клиент
+            return forwarded.split(",")[-1].strip()
+    return peer
+
+
 @app.post("/login/", summary="login in", response_model=TokenScheme)
 async def login(
+    request: Request,
     user_data: OAuth2PasswordRequestForm = Depends(),
     db: AsyncSession = Depends(get_session),
 ):
-    user = await authuser(user_data.username, user_data.password, db)
+    user = await authuser(user_data.username, user_data.password, db, client_ip(request))
 
     access_token = await create_access_token(
         {"username": user.username, "user_id": user.id}
@@ -120,18 +155,27 @@ async def refresh_token(
 async def logout_from_all_devices(
     user_id: int, db: AsyncSession = Depends(get_session)
 ):
-    user = await db.get(User, user_id)
+    version = await revoke_refresh_tokens(user_id, db)
 
-    if not user:
+    if version is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    user.refresh_token_version += 1
-
-    await db.commit()
-    await db.refresh(user)
-
     return LogoutResponse(
         message="Logged out from all devices",
-        user_id=user.id,
-        refresh_token_version=user.refresh_token_version,
+        user_id=user_id,
+        refresh_token_version=version,
     )
+
+
+@app.get("/.well-known/jwks.json", summary="открытые ключи для проверки токенов")
+async def jwks():
+    # набор ключей меняется только при ротации, проверяющие сервисы могут его кэшировать
+    return JSONResponse(
+        key_ring.jwks(),
+        headers={"Cache-Control": f"public, max-age={settings.JWKS_MAX_AGE}"},
+    )
+
+
+@app.get("/metrics", summary="метрики в формате Prometheus")
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
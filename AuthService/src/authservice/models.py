@@ -1,4 +1,8 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, BigInteger
+import uuid
+from datetime import datetime
+
+from sqlalchemy import Column, String, Integer, ForeignKey, BigInteger, DateTime, Index, func, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, Relationship, declarative_base, mapped_column
 
 
@@ -13,4 +17,27 @@ class User(Base):
     email: Mapped[str] = mapped_column(String, unique = True, nullable=False)
     role: Mapped[str] = mapped_column(String(24), nullable=False, default="user")
 
-    refresh_token_version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
\ No newline at end of file
+    refresh_token_version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class OutboxEvent(Base):
+    """Событие для брокера, записанное в одной транзакции с изменением данных."""
+    __tablename__ = "outbox"
+    __table_args__ = (
+        # relay выбирает только неотправленные события
+        Index(
+            "ix_outbox_pending",
+            "next_attempt_at",
+            postgresql_where=text("published_at IS NULL"),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    idempotency_key: Mapped[str] = mapped_column(String(36), nullable=False, unique=True, default=lambda: str(uuid.uuid4()))
+    queue: Mapped[str] = mapped_column(String(64), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_error: Mapped[str | None] = mapped_column(String, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    published_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select
+
+from .database import sessionmaker
+from .metrics import registry
+from .models import OutboxEvent
+from .rabbitmq.producer_user_auth import RBPUserAuth
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+outbox_published = registry.counter(
+    "auth_outbox_published_total",
+    "События outbox, подтверждённые брокером",
+    ("queue",),
+)
+outbox_failed = registry.counter(
+    "auth_outbox_publish_failed_total",
+    "Неудачные попытки отправить событие outbox (будут повторены)",
+    ("queue",),
+)
+outbox_delivery_delay = registry.histogram(
+    "auth_outbox_delivery_delay_seconds",
+    "Время от записи события в outbox до подтверждения брокером",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 60.0, 300.0, 3600.0),
+)
+
+
+class OutboxRelay:
+    """Фоновая задача, переносящая события из таблицы outbox в RabbitMQ.
+
+    События выбираются пачками через FOR UPDATE SKIP LOCKED, поэтому
+    несколько реплик сервиса не отправляют одно событие одновременно.
+    Доставка "хотя бы один раз": message_id сообщения равен ключу
+    идемпотентности события, по нему потребитель отбрасывает повторы.
+    Неудачные события повторяются с экспоненциальной задержкой.
+    """
+
+    def __init__(
+        self,
+        publisher,
+        batch_size: int = settings.OUTBOX_BATCH_SIZE,
+        poll_interval: float = settings.OUTBOX_POLL_INTERVAL,
+        publish_timeout: float = settings.OUTBOX_PUBLISH_TIMEOUT,
+        retry_base: float = settings.OUTBOX_RETRY_BASE,
+        retry_max: float = settings.OUTBOX_RETRY_MAX,
+        retention: float = settings.OUTBOX_RETENTION_HOURS,
+    ):
+        self.publisher = publisher
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.publish_timeout = publish_timeout
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.retention = timedelta(hours=retention)
+
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._last_cleanup = 0.0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def notify(self):
+        """Будит relay сразу после коммита, не дожидаясь следующего опроса."""
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                published = await self.drain_once()
+                await self._cleanup()
+            except Exception:
+                logger.exception("Outbox relay iteration failed")
+                published = 0
+
+            # полная пачка - скорее всего есть ещё, забираем без паузы
+            if published >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def drain_once(self) -> int:
+        """Отправляет одну пачку готовых событий, возвращает их число."""
+        if not self.publisher.connection:
+            # без брокера события не трогаем, чтобы не тратить их попытки
+            await self.publisher.connect()
+
+        async with sessionmaker() as db, db.begin():
+            result = await db.execute(
+                select(OutboxEvent)
+                .where(
+                    OutboxEvent.queue == self.publisher.queue_name,
+                    OutboxEvent.published_at.is_(None),
+                    OutboxEvent.next_attempt_at <= datetime.now(timezone.utc),
+                )
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            events = result.scalars().all()
+            if not events:
+                return 0
+
+            results = await asyncio.gather(
+                *(
+                    asyncio.wait_for(
+                        self.publisher.publish(event.payload, message_id=event.idempotency_key),
+                        self.publish_timeout,
+                    )
+                    for event in events
+                ),
+                return_exceptions=True,
+            )
+
+            now = datetime.now(timezone.utc)
+            for event, error in zip(events, results):
+                event.attempts += 1
+                if isinstance(error, BaseException):
+                    delay = min(self.retry_max, self.retry_base * 2 ** (event.attempts - 1))
+                    event.next_attempt_at = now + timedelta(seconds=delay)
+                    event.last_error = repr(error)[:500]
+                    outbox_failed.inc(queue=event.queue)
+                else:
+                    event.published_at = now
+                    event.last_error = None
+                    outbox_published.inc(queue=event.queue)
+                    outbox_delivery_delay.observe((now - event.created_at).total_seconds())
+
+            failed = sum(isinstance(error, BaseException) for error in results)
+            if failed:
+                logger.warning("Outbox: %s of %s events failed to publish", failed, len(events))
+            return len(events)
+
+    async def _cleanup(self):
+        """Раз в минуту удаляет отправленные события старше срока хранения."""
+        if time.monotonic() - self._last_cleanup < 60:
+            return
+        self._last_cleanup = time.monotonic()
+        async with sessionmaker() as db, db.begin():
+            await db.execute(
+                delete(OutboxEvent).where(
+                    OutboxEvent.published_at < datetime.now(timezone.utc) - self.retention
+                )
+            )
+
+
+outbox_relay = OutboxRelay(RBPUserAuth)
@@ -1,22 +1,138 @@
 import asyncio
-import aio_pika
 import json
+import logging
+
+import aio_pika
+from aio_pika.pool import Pool
+
 from ..settings import settings
 
+logger = logging.getLogger(__name__)
+
+
+class RBP_USER_AUTH:
+    """Долгоживущий издатель в очередь user_add.
+
+    Соединение и пул каналов открываются один раз в lifespan. Сообщения
+    складываются в ограниченный буфер, фоновые задачи забирают их пачками
+    и публикуют с подтверждениями брокера (publisher confirms): вызывающий
+    ждёт, пока брокер примет его сообщение.
+    """
+
+    def __init__(
+        self,
+        amqp_url: str = settings.RBP_USER_AUTH_URL,
+        queue_name: str = "user_add",
+        channel_pool_size: int = settings.RBP_USER_AUTH_CHANNEL_POOL_SIZE,
+        buffer_size: int = settings.RBP_USER_AUTH_BUFFER_SIZE,
+        batch_size: int = settings.RBP_USER_AUTH_BATCH_SIZE,
+        buffer_timeout: float = settings.RBP_USER_AUTH_BUFFER_TIMEOUT,
+    ):
+        self.amqp_url = amqp_url
+        self.queue_name = queue_name
+        self.channel_pool_size = channel_pool_size
+        self.batch_size = batch_size
+        self.buffer_timeout = buffer_timeout
+
+        self.connection: aio_pika.RobustConnection | None = None
+        self.channel_pool: Pool | None = None
+        self._buffer: asyncio.Queue[tuple[aio_pika.Message, asyncio.Future]] = asyncio.Queue(buffer_size)
+        self._workers: list[asyncio.Task] = []
+        self._connect_lock = asyncio.Lock()
 
-async def send_message_to_userservice(user_data: dict):
-    connection = await aio_pika.connect_robust(
-        settings.RBP_USER_AUTH_URL  # имя контейнера, не localhost
-    )
+    async def connect(self):
+        async with self._connect_lock:
+            if self.connection:
+                return
+            connection = await aio_pika.connect_robust(self.amqp_url)
 
-    async with connection:
-        channel = await connection.channel()
-        queue = await channel.declare_queue("user_add", durable=True)
+            async def get_channel() -> aio_pika.abc.AbstractChannel:
+                return await connection.channel(publisher_confirms=True)
 
-        await channel.default_exchange.publish(
-            aio_pika.Message(body=json.dumps(user_data).encode()),
-            routing_key=queue.name,
+            channel_pool = Pool(get_channel, max_size=self.channel_pool_size)
+            try:
+                # очередь объявляется один раз, а не на каждую публикацию
+                async with channel_pool.acquire() as channel:
+                    await channel.declare_queue(self.queue_name, durable=True)
+            except Exception:
+                await channel_pool.close()
+                await connection.close()
+                raise
+
+            self.connection = connection
+            self.channel_pool = channel_pool
+
+            self._workers = [
+                asyncio.create_task(self._publish_batches())
+                for _ in range(self.channel_pool_size)
+            ]
+
+    async def publish(self, data: dict, message_id: str | None = None):
+        """Кладёт сообщение в буфер и ждёт подтверждения от брокера.
+
+        Если буфер полон дольше `buffer_timeout` секунд, выбрасывает
+        asyncio.TimeoutError вместо неограниченного роста очереди.
+        """
+        if not self.connection:
+            await self.connect()
+
+        message = aio_pika.Message(
+            body=json.dumps(data).encode(),
+            content_type="application/json",
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            message_id=message_id,
         )
+        confirmed = asyncio.get_running_loop().create_future()
+        await asyncio.wait_for(self._buffer.put((message, confirmed)), self.buffer_timeout)
+        await confirmed
+
+    async def _publish_batches(self):
+        while True:
+            batch = [await self._buffer.get()]
+            while len(batch) < self.batch_size and not self._buffer.empty():
+                batch.append(self._buffer.get_nowait())
+
+            try:
+                async with self.channel_pool.acquire() as channel:
+                    # публикации идут друг за другом без ожидания,
+                    # подтверждения брокера собираются для всей пачки разом
+                    results = await asyncio.gather(
+                        *(
+                            channel.default_exchange.publish(message, routing_key=self.queue_name)
+                            for message, _ in batch
+                        ),
+                        return_exceptions=True,
+                    )
+            except Exception as e:
+                results = [e] * len(batch)
+
+            for (_, confirmed), result in zip(batch, results):
+                if confirmed.done():
+                    continue
+                if isinstance(result, BaseException):
+                    confirmed.set_exception(result)
+                else:
+                    confirmed.set_result(None)
+            for _ in batch:
+                self._buffer.task_done()
 
+    async def close(self):
+        """Дожидается отправки буфера и закрывает соединение с RabbitMQ."""
+        if self._workers:
+            try:
+                await asyncio.wait_for(self._buffer.join(), self.buffer_timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Closing publisher with %s unsent messages", self._buffer.qsize())
+            for worker in self._workers:
+                worker.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers = []
+        if self.channel_pool:
+            await self.channel_pool.close()
+            self.channel_pool = None
+        if self.connection:
+            await self.connection.close()
+            self.connection = None
 
 
+RBPUserAuth = RBP_USER_AUTH()
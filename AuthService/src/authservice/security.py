@@ -1,14 +1,162 @@
 import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
 from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from fastapi import HTTPException, status
+
+from .metrics import registry
+from .settings import settings
+
+
+PwdHasher = PasswordHasher(
+    time_cost=settings.ARGON2_TIME_COST,
+    memory_cost=settings.ARGON2_MEMORY_COST,
+    parallelism=settings.ARGON2_PARALLELISM,
+)
+
+hash_duration = registry.histogram(
+    "auth_password_hash_duration_seconds",
+    "Время хэширования/проверки пароля, включая ожидание в очереди",
+    ("operation",),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+hash_rejected = registry.counter(
+    "auth_password_hash_rejected_total",
+    "Операции с паролями, отклонённые из-за переполненной очереди",
+    ("operation",),
+)
+
+
+# выполняются в процессах пула, поэтому определены на уровне модуля
+def _hash(password: str) -> str:
+    return PwdHasher.hash(password)
+
+
+def _verify(hashed_password: str, plain_password: str) -> bool:
+    try:
+        return PwdHasher.verify(hashed_password, plain_password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+
+def _warmup():
+    return None
+
+
+def _overloaded() -> HTTPException:
+    # 429, а не 503: gateway считает 5xx отказом сервиса и размыкает breaker
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many hashing requests, try again later",
+        headers={"Retry-After": "1"},
+    )
+
+
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, try again later",
+        headers={"Retry-After": "1"},
+    )
+
 
+class HashingEngine:
+    """Пул процессов для argon2 с ограниченной очередью.
+
+    Хэширование выполняется вне процесса сервера и не отнимает GIL у остальных
+    эндпоинтов. Если в работе и в очереди уже `max_pending` операций, новая
+    сразу отклоняется с 429 вместо того, чтобы бесконечно ждать.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: ProcessPoolExecutor | None = None
+        self.pending = 0
+
+    def start(self):
+        if self._executor is None:
+            # spawn: форк процесса с запущенным event loop и пулом БД небезопасен
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+    async def warmup(self):
+        """Поднимает все процессы заранее, чтобы первые логины не ждали их запуска."""
+        self.start()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(loop.run_in_executor(self._executor, _warmup) for _ in range(self.workers))
+        )
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, operation: str, func, *args):
+        if self.pending >= self.max_pending:
+            hash_rejected.inc(operation=operation)
+            raise _overloaded()
+
+        self.start()
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            job = self._executor.submit(func, *args)
+        except BrokenProcessPool:
+            self._executor = None
+            raise _busy()
+        # счётчик уменьшается, когда задача в пуле действительно завершилась:
+        # при отключении клиента корутина отменяется, а argon2 продолжает считать
+        self.pending += 1
+        job.add_done_callback(lambda _: self._job_done(loop))
+        try:
+            return await asyncio.wrap_future(job)
+        except BrokenProcessPool:
+            # процесс пула упал: пересоздаём пул для следующих запросов
+            self._executor = None
+            raise _busy()
+        finally:
+            hash_duration.observe(time.perf_counter() - started, operation=operation)
+
+    def _job_done(self, loop: asyncio.AbstractEventLoop):
+        # вызывается из потока пула, счётчик меняется в потоке event loop
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(self._decrement)
+
+    def _decrement(self):
+        self.pending -= 1
+
+
+hashing_engine = HashingEngine(
+    workers=settings.HASH_WORKERS,
+    max_pending=settings.HASH_MAX_PENDING,
+)
+
+registry.add_collector(
+    lambda: [
+        ("auth_password_hash_pending", "gauge", "Операции с паролями в работе и в очереди", [({}, hashing_engine.pending)]),
+        ("auth_password_hash_max_pending", "gauge", "Лимит операций в работе и в очереди", [({}, hashing_engine.max_pending)]),
+    ]
+)
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """Хэш посчитан с параметрами, отличными от текущих настроек."""
+    try:
+        return PwdHasher.check_needs_rehash(hashed_password)
+    except InvalidHashError:
+        return False
 
-PwdHasher = PasswordHasher()
 
 async def hash_password(password: str) -> str:
-    return await asyncio.to_thread(PwdHasher.hash, password)
+    return await hashing_engine.run("hash", _hash, password)
 
 async def verify_password(plain_password: str, hashed_password:str ) -> bool:
-    try:
-        return await asyncio.to_thread(PwdHasher.verify, hashed_password, plain_password)
-    except:
-        return False
\ No newline at end of file
+    return await hashing_engine.run("verify", _verify, hashed_password, plain_password)
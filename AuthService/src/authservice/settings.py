@@ -22,16 +22,74 @@ class Settings(BaseSettings):
     RBP_USER_AUTH_PASSWORD: str
     RBP_USER_AUTH_HOST: str
     RBP_USER_AUTH_PORT: str
+    # каналы в пуле издателя, размер буфера сообщений, сообщений в одной пачке
+    # подтверждений и сколько секунд ждать места в полном буфере
+    RBP_USER_AUTH_CHANNEL_POOL_SIZE: int = 4
+    RBP_USER_AUTH_BUFFER_SIZE: int = 1000
+    RBP_USER_AUTH_BATCH_SIZE: int = 100
+    RBP_USER_AUTH_BUFFER_TIMEOUT: float = 5.0
+
+    # outbox: событий в пачке, период опроса таблицы, таймаут подтверждения,
+    # задержка повтора (удваивается до максимума) и срок хранения отправленных
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_INTERVAL: float = 1.0
+    OUTBOX_PUBLISH_TIMEOUT: float = 10.0
+    OUTBOX_RETRY_BASE: float = 1.0
+    OUTBOX_RETRY_MAX: float = 300.0
+    OUTBOX_RETENTION_HOURS: float = 24.0
     
 
     # jwt
     JWT_PRIVATE_KEY_PATH: str 
     JWT_PUBLIC_KEY_PATH: str 
     JWT_ALGORITHM: str
+    # kid в заголовке токенов; пустой - отпечаток ключа по RFC 7638
+    JWT_KEY_ID: str = ""
+    # дополнительные ключи, которыми ещё принимаются токены (ротация):
+    # [{"path": "/keys/old_public.pem", "alg": "RS256", "kid": "..."}]
+    JWT_VERIFY_KEYS: list[dict] = []
+    # сколько секунд проверяющие сервисы могут кэшировать /.well-known/jwks.json
+    JWKS_MAX_AGE: int = 300
 
     JWT_PRIVATE_KEY: str = ""
     JWT_PUBLIC_KEY: str = ""
 
+    # кэш версий refresh-токенов: memory (на процесс) или redis (общий для реплик)
+    TOKEN_VERSION_CACHE_BACKEND: str = "memory"
+    TOKEN_VERSION_CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    TOKEN_VERSION_CACHE_TTL: float = 30.0
+    TOKEN_VERSION_CACHE_MAX_ENTRIES: int = 100_000
+
+    # параметры argon2 (по умолчанию - значения argon2-cffi),
+    # подбираются под железо командой python -m src.authservice.calibrate
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536
+    ARGON2_PARALLELISM: int = 4
+
+    # задержка после неудачных входов: после *_FREE_ATTEMPTS неудач вход
+    # блокируется на BASE_DELAY секунд, дальше задержка удваивается до MAX_DELAY;
+    # счётчик забывается через WINDOW секунд без неудач
+    LOGIN_THROTTLE_ENABLED: bool = True
+    # memory - в памяти процесса, redis - общий для всех реплик
+    LOGIN_THROTTLE_BACKEND: str = "memory"
+    LOGIN_THROTTLE_REDIS_URL: str = "redis://localhost:6379/0"
+    LOGIN_THROTTLE_MAX_KEYS: int = 100_000
+    LOGIN_THROTTLE_USERNAME_FREE_ATTEMPTS: int = 5
+    LOGIN_THROTTLE_IP_FREE_ATTEMPTS: int = 20
+    LOGIN_THROTTLE_BASE_DELAY: float = 1.0
+    LOGIN_THROTTLE_MAX_DELAY: float = 900.0
+    LOGIN_THROTTLE_WINDOW: float = 900.0
+    # IP клиента - последний адрес X-Forwarded-For, его дописывает gateway.
+    # Заголовок учитывается, только если соединение пришло с адреса из
+    # TRUSTED_PROXIES (IP или подсеть, например "172.16.0.0/12"), иначе
+    # клиент, обратившийся к сервису напрямую, подставил бы любой IP
+    LOGIN_THROTTLE_TRUST_FORWARDED: bool = False
+    LOGIN_THROTTLE_TRUSTED_PROXIES: list[str] = []
+
+    # пул процессов для argon2: число процессов и лимит операций в работе и в очереди
+    HASH_WORKERS: int = 2
+    HASH_MAX_PENDING: int = 32
+
 
     @property
     def DATABASE_URL_asyncpg(self):
@@ -0,0 +1,221 @@
+import logging
+import math
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException, status
+
+from .metrics import registry
+from .settings import settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis нужен только для общего бэкенда
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+login_throttled = registry.counter(
+    "auth_login_throttled_total",
+    "Попытки входа, отклонённые до проверки пароля",
+    ("scope",),
+)
+login_failures = registry.counter(
+    "auth_login_failures_total",
+    "Неудачные попытки входа",
+)
+
+
+def backoff(failures: int, free_attempts: int, base_delay: float, max_delay: float) -> float:
+    """Первые free_attempts неудач без задержки, дальше она удваивается."""
+    if failures < free_attempts:
+        return 0.0
+    return min(max_delay, base_delay * 2 ** (failures - free_attempts))
+
+
+class InMemoryFailureStore:
+    """Счётчики неудачных входов в памяти процесса.
+
+    Запись: [число неудач, до какого момента вход запрещён, время последней
+    неудачи]. Число ключей ограничено, давно не обновлявшиеся вытесняются.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._entries: OrderedDict[str, list[float]] = OrderedDict()
+
+    def _entry(self, key: str, window: float) -> list[float] | None:
+        entry = self._entries.get(key)
+        now = time.time()
+        if entry is not None and now - entry[2] > window and now >= entry[1]:
+            # давно не было неудач - счётчик начинается заново
+            del self._entries[key]
+            return None
+        return entry
+
+    async def blocked_for(self, key: str, window: float) -> float:
+        entry = self._entry(key, window)
+        if entry is None:
+            return 0.0
+        return max(0.0, entry[1] - time.time())
+
+    async def record_failure(self, key: str, free_attempts: int, base_delay: float, max_delay: float, window: float) -> float:
+        now = time.time()
+        entry = self._entry(key, window)
+        if entry is None:
+            entry = self._entries[key] = [0, 0.0, now]
+            if len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(key)
+
+        entry[0] += 1
+        entry[2] = now
+        delay = backoff(entry[0], free_attempts, base_delay, max_delay)
+        entry[1] = now + delay
+        return delay
+
+    async def reset(self, key: str):
+        self._entries.pop(key, None)
+
+    async def close(self):
+        pass
+
+
+# Обновление счётчика одной командой, время берётся с сервера Redis
+RECORD_FAILURE_SCRIPT = """
+local free_attempts = tonumber(ARGV[1])
+local base_delay = tonumber(ARGV[2])
+local max_delay = tonumber(ARGV[3])
+local window = tonumber(ARGV[4])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local failures = redis.call('HINCRBY', KEYS[1], 'failures', 1)
+local delay = 0
+if failures >= free_attempts then
+    delay = math.min(max_delay, base_delay * 2 ^ (failures - free_attempts))
+end
+redis.call('HSET', KEYS[1], 'blocked_until', now + delay)
+redis.call('EXPIRE', KEYS[1], math.ceil(math.max(window, delay)))
+return tostring(delay)
+"""
+
+BLOCKED_FOR_SCRIPT = """
+local blocked_until = tonumber(redis.call('HGET', KEYS[1], 'blocked_until'))
+if not blocked_until then
+    return '0'
+end
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+return tostring(math.max(0, blocked_until - now))
+"""
+
+
+class RedisFailureStore:
+    """Общие для всех реплик счётчики неудачных входов в Redis.
+
+    Окно сброса счётчика - TTL ключа, который продлевается при каждой неудаче.
+    """
+
+    def __init__(self, url: str, prefix: str = "login_failures:"):
+        if aioredis is None:
+            raise RuntimeError("LOGIN_THROTTLE_BACKEND=redis requires the 'redis' package")
+        self.prefix = prefix
+        self._redis = aioredis.from_url(url)
+        self._record = self._redis.register_script(RECORD_FAILURE_SCRIPT)
+        self._blocked_for = self._redis.register_script(BLOCKED_FOR_SCRIPT)
+
+    async def blocked_for(self, key: str, window: float) -> float:
+        try:
+            return float(await self._blocked_for(keys=[self.prefix + key]))
+        except Exception as e:
+            # недоступность хранилища не должна блокировать вход
+            logger.warning("Login throttle backend unavailable: %s", type(e).__name__)
+            return 0.0
+
+    async def record_failure(self, key: str, free_attempts: int, base_delay: float, max_delay: float, window: float) -> float:
+        try:
+            return float(await self._record(
+                keys=[self.prefix + key],
+                args=[free_attempts, base_delay, max_delay, window],
+            ))
+        except Exception as e:
+            logger.warning("Login throttle backend unavailable: %s", type(e).__name__)
+            return 0.0
+
+    async def reset(self, key: str):
+        try:
+            await self._redis.delete(self.prefix + key)
+        except Exception as e:
+            logger.warning("Login throttle backend unavailable: %s", type(e).__name__)
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+class LoginThrottle:
+    """Экспоненциальная задержка после неудачных входов по имени и по IP.
+
+    Проверка выполняется до запроса в базу и до argon2, поэтому перебор
+    паролей упирается в 429, а не в CPU. Успешный вход сбрасывает только
+    счётчик имени: счётчик IP сбрасывается по окну, иначе атакующий мог бы
+    обнулять его входом в свою учётную запись.
+    """
+
+    def __init__(
+        self,
+        store,
+        username_free_attempts: int,
+        ip_free_attempts: int,
+        base_delay: float,
+        max_delay: float,
+        window: float,
+    ):
+        self.store = store
+        self.free_attempts = {"username": username_free_attempts, "ip": ip_free_attempts}
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.window = window
+
+    @staticmethod
+    def _keys(username: str, ip: str | None) -> list[tuple[str, str]]:
+        keys = [("username", f"username:{username.lower()}")]
+        if ip:
+            keys.append(("ip", f"ip:{ip}"))
+        return keys
+
+    async def check(self, username: str, ip: str | None):
+        for scope, key in self._keys(username, ip):
+            retry_after = await self.store.blocked_for(key, self.window)
+            if retry_after > 0:
+                login_throttled.inc(scope=scope)
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many failed login attempts, try again later",
+                    headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+                )
+
+    async def failure(self, username: str, ip: str | None):
+        login_failures.inc()
+        for scope, key in self._keys(username, ip):
+            await self.store.record_failure(
+                key, self.free_attempts[scope], self.base_delay, self.max_delay, self.window
+            )
+
+    async def success(self, username: str):
+        await self.store.reset(f"username:{username.lower()}")
+
+
+if settings.LOGIN_THROTTLE_BACKEND == "redis":
+    failure_store = RedisFailureStore(settings.LOGIN_THROTTLE_REDIS_URL)
+else:
+    failure_store = InMemoryFailureStore(settings.LOGIN_THROTTLE_MAX_KEYS)
+
+login_throttle = LoginThrottle(
+    failure_store,
+    username_free_attempts=settings.LOGIN_THROTTLE_USERNAME_FREE_ATTEMPTS,
+    ip_free_attempts=settings.LOGIN_THROTTLE_IP_FREE_ATTEMPTS,
+    base_delay=settings.LOGIN_THROTTLE_BASE_DELAY,
+    max_delay=settings.LOGIN_THROTTLE_MAX_DELAY,
+    window=settings.LOGIN_THROTTLE_WINDOW,
+)
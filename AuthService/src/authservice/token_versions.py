@@ -0,0 +1,106 @@
+import logging
+import time
+from collections import OrderedDict
+
+from .metrics import registry
+from .settings import settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis нужен только для общего бэкенда
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+version_cache_lookups = registry.counter(
+    "auth_token_version_cache_total",
+    "Проверки версии refresh-токена по кэшу (hit - без запроса в базу)",
+    ("result",),
+)
+
+
+class InMemoryVersionCache:
+    """Версии refresh-токенов по user_id в памяти процесса, с TTL и LRU.
+
+    Подходит для одной реплики: logout на другой реплике станет виден
+    здесь только после истечения TTL.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[int, tuple[int, float]] = OrderedDict()
+
+    async def get(self, user_id: int) -> int | None:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        version, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return version
+
+    async def fill(self, user_id: int, version: int):
+        """Кладёт версию, прочитанную из базы, если её ещё нет в кэше.
+
+        Не перезаписывает значение: иначе запрос, прочитавший версию до
+        logout, мог бы вернуть в кэш уже отозванную версию.
+        """
+        if await self.get(user_id) is None:
+            self._store(user_id, version)
+
+    async def set(self, user_id: int, version: int):
+        self._store(user_id, version)
+
+    def _store(self, user_id: int, version: int):
+        self._entries[user_id] = (version, time.monotonic() + self.ttl)
+        self._entries.move_to_end(user_id)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def close(self):
+        pass
+
+
+class RedisVersionCache:
+    """Общий для всех реплик кэш версий в Redis: logout виден сразу везде."""
+
+    def __init__(self, url: str, ttl: float, prefix: str = "refresh_version:"):
+        if aioredis is None:
+            raise RuntimeError("TOKEN_VERSION_CACHE_BACKEND=redis requires the 'redis' package")
+        self.ttl = ttl
+        self.prefix = prefix
+        self._redis = aioredis.from_url(url)
+
+    async def get(self, user_id: int) -> int | None:
+        try:
+            value = await self._redis.get(f"{self.prefix}{user_id}")
+        except Exception as e:
+            # при недоступном Redis версия читается из базы
+            logger.warning("Token version cache unavailable: %s", type(e).__name__)
+            return None
+        return int(value) if value is not None else None
+
+    async def fill(self, user_id: int, version: int):
+        try:
+            await self._redis.set(f"{self.prefix}{user_id}", version, px=int(self.ttl * 1000), nx=True)
+        except Exception as e:
+            logger.warning("Token version cache unavailable: %s", type(e).__name__)
+
+    async def set(self, user_id: int, version: int):
+        try:
+            await self._redis.set(f"{self.prefix}{user_id}", version, px=int(self.ttl * 1000))
+        except Exception:
+            # без этого другие реплики примут старые токены до истечения TTL
+            logger.exception("Failed to update token version cache for user %s", user_id)
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+if settings.TOKEN_VERSION_CACHE_BACKEND == "redis":
+    version_cache = RedisVersionCache(settings.TOKEN_VERSION_CACHE_REDIS_URL, settings.TOKEN_VERSION_CACHE_TTL)
+else:
+    version_cache = InMemoryVersionCache(settings.TOKEN_VERSION_CACHE_TTL, settings.TOKEN_VERSION_CACHE_MAX_ENTRIES)
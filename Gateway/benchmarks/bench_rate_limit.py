@@ -0,0 +1,75 @@
+"""Накладные расходы ограничителя частоты на один запрос.
+
+Запуск из каталога Gateway (нужны те же переменные окружения, что и для gateway):
+
+    python benchmarks/bench_rate_limit.py
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from gateway.ratelimit import InMemoryBackend, RateLimitMiddleware  # noqa: E402
+
+N = 200_000
+
+
+async def app(scope, receive, send):
+    pass
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message):
+    pass
+
+
+def scope_for(ip: str, path: str = "/get_list_of_pins") -> dict:
+    return {
+        "type": "http",
+        "method": "POST",
+        "path": path,
+        "headers": [],
+        "client": (ip, 12345),
+    }
+
+
+async def run(label: str, handler, scopes: list[dict]):
+    started = time.perf_counter()
+    for i in range(N):
+        await handler(scopes[i % len(scopes)], receive, send)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<40} {elapsed / N * 1e6:8.2f} us/request")
+    return elapsed / N
+
+
+async def main():
+    # лимиты заведомо не достигаются, измеряется только стоимость проверки
+    middleware_kwargs = dict(
+        ip_limit="1000000000/1",
+        user_limit="1000000000/1",
+        route_limits={"/get_list_of_pins": "1000000000/1", "/user/profile/{id}": "1000000000/1"},
+        exempt_paths=["/metrics"],
+    )
+    one_client = [scope_for("10.0.0.1")]
+    many_clients = [scope_for(f"10.0.{i // 256}.{i % 256}") for i in range(10_000)]
+
+    base = await run("без ограничителя", app, one_client)
+    limited = RateLimitMiddleware(app, backend=InMemoryBackend(100_000), **middleware_kwargs)
+    hot = await run("memory, один клиент", limited, one_client)
+    limited = RateLimitMiddleware(app, backend=InMemoryBackend(100_000), **middleware_kwargs)
+    spread = await run("memory, 10000 клиентов", limited, many_clients)
+    limited = RateLimitMiddleware(app, backend=InMemoryBackend(1_000), **middleware_kwargs)
+    evicting = await run("memory, 10000 клиентов, вытеснение", limited, many_clients)
+
+    print()
+    for label, value in (("один клиент", hot), ("10000 клиентов", spread), ("с вытеснением", evicting)):
+        print(f"накладные расходы ({label}): {(value - base) * 1e6:.2f} us/request")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
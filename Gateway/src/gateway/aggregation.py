@@ -0,0 +1,97 @@
+import asyncio
+
+import httpx
+
+from .clients.circuit_breaker import DownstreamUnavailable
+from .clients.comment_client import comment_client
+from .clients.pin_client import pin_client
+from .clients.user_client import user_client
+from .schemas import PinPage, ProfileCard, ProfileComment
+from .settings import settings
+
+
+def _describe_error(error: BaseException) -> str:
+    if isinstance(error, (asyncio.TimeoutError, httpx.TimeoutException)):
+        return "timeout"
+    if isinstance(error, DownstreamUnavailable):
+        return "unavailable"
+    if isinstance(error, httpx.HTTPStatusError):
+        return f"status {error.response.status_code}"
+    return type(error).__name__
+
+
+async def load_pin_page(pin_id: int, limit: int, offset: int) -> PinPage | None:
+    """Собирает страницу пина: пин, комментарии и профили авторов.
+
+    Две независимые цепочки выполняются параллельно:
+    пин -> карточка автора и комментарии -> профили комментаторов
+    (одним пакетным запросом), поэтому время ответа равно самой медленной
+    цепочке, а не сумме всех вызовов.
+    Упавшая часть попадает в `errors`, остальные данные возвращаются как есть.
+    Возвращает None, если пин не найден.
+    """
+    page = PinPage()
+    pin_found = True
+
+    async def load_pin_and_author():
+        nonlocal pin_found
+        try:
+            pins = await asyncio.wait_for(
+                pin_client.get_list_of_pins([pin_id]), settings.PIN_PAGE_PIN_TIMEOUT
+            )
+        except Exception as e:
+            page.errors["pin"] = _describe_error(e)
+            return
+
+        if not pins:
+            pin_found = False
+            return
+        page.pin = pins[0]
+
+        try:
+            card = await asyncio.wait_for(
+                user_client.get_profile_card(page.pin["user_id"]),
+                settings.PIN_PAGE_AUTHOR_TIMEOUT,
+            )
+            page.author = ProfileCard(**card)
+        except Exception as e:
+            page.errors["author"] = _describe_error(e)
+
+    async def load_comments_and_authors():
+        try:
+            page.comments = await asyncio.wait_for(
+                comment_client.get_comments(pin_id, limit, offset),
+                settings.PIN_PAGE_COMMENTS_TIMEOUT,
+            )
+        except httpx.HTTPStatusError as e:
+            # CommentService отвечает 404, если комментариев нет
+            if e.response.status_code != 404:
+                page.errors["comments"] = _describe_error(e)
+            return
+        except Exception as e:
+            page.errors["comments"] = _describe_error(e)
+            return
+
+        author_ids = list(dict.fromkeys(c["user_id"] for c in page.comments))
+        if not author_ids:
+            return
+        try:
+            profiles = await asyncio.wait_for(
+                user_client.get_profile_comments(author_ids),
+                settings.PIN_PAGE_COMMENT_AUTHORS_TIMEOUT,
+            )
+        except Exception as e:
+            page.errors["comment_authors"] = _describe_error(e)
+            return
+
+        for id, profile in profiles.items():
+            try:
+                page.comment_authors[id] = ProfileComment(**profile)
+            except Exception as e:
+                page.errors["comment_authors"] = _describe_error(e)
+
+    await asyncio.gather(load_pin_and_author(), load_comments_and_authors())
+
+    if not pin_found:
+        return None
+    return page
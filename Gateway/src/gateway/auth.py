@@ -1,20 +1,48 @@
+import hashlib
+import time
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 
+from .cache import TTLCache
+from .jwks import jwks_cache
 from .settings import settings
 
-JWT_PUBLIC_KEY = settings.JWT_PUBLIC_KEY
-
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# уже проверенные токены: sha256(token) -> claims, хранятся до exp
+token_cache = TTLCache(settings.JWT_CACHE_MAX_ENTRIES)
+
 
 async def decode_token(token: str) -> dict | None:
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is not None:
+        return payload
+
     try:
-        return jwt.decode(token, JWT_PUBLIC_KEY, algorithms=[settings.JWT_ALGORITHM])
+        kid = jwt.get_unverified_header(token).get("kid")
     except JWTError:
         return None
 
+    payload = None
+    for public_key, algorithm in await jwks_cache.keys_for(kid):
+        try:
+            payload = jwt.decode(token, public_key, algorithms=[algorithm])
+            break
+        except JWTError:
+            continue
+    if payload is None:
+        return None
+
+    try:
+        ttl = int(payload["exp"]) - time.time()
+    except (KeyError, TypeError, ValueError):
+        ttl = 0
+    token_cache.set(key, payload, ttl)
+    return payload
+
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
@@ -0,0 +1,175 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+_MISSING = object()
+
+
+class SingleFlight:
+    """Схлопывает одновременные вызовы с одинаковым ключом в один.
+
+    Первый вызов запускает `func` в отдельной задаче, остальные ждут её же
+    результат. Отмена одного из ожидающих не отменяет общий вызов.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Future):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # помечаем исключение прочитанным, даже если все ожидающие отменились
+        if not task.cancelled():
+            task.exception()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+class TTLCache:
+    """Ограниченный по числу записей LRU-кэш с TTL на каждую запись."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._single_flight = SingleFlight()
+        # ключ -> метка текущей загрузки; инвалидация ключа снимает метку,
+        # чтобы загрузка, начатая до неё, не положила в кэш устаревшее значение
+        self._loading: dict[Hashable, object] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float):
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        self._loading.pop(key, None)
+        return self._data.pop(key, None) is not None
+
+    def clear(self):
+        self._loading.clear()
+        self._data.clear()
+
+    def _begin_load(self, key: Hashable) -> object:
+        mark = self._loading[key] = object()
+        return mark
+
+    def _end_load(self, key: Hashable, mark: object) -> bool:
+        """True, если ключ не инвалидировали с начала загрузки."""
+        if self._loading.get(key) is mark:
+            del self._loading[key]
+            return True
+        return False
+
+    async def get_or_load(
+        self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: float
+    ) -> Any:
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        async def load():
+            mark = self._begin_load(key)
+            try:
+                value = await loader()
+            except BaseException:
+                self._end_load(key, mark)
+                raise
+            if self._end_load(key, mark):
+                self.set(key, value, ttl)
+            return value
+
+        return await self._single_flight.do(key, load)
+
+    async def get_many_or_load(
+        self,
+        keys: list[Hashable],
+        loader: Callable[[list[Hashable]], Awaitable[dict]],
+        ttl: float,
+    ) -> dict:
+        """Как get_or_load, но для набора ключей.
+
+        Отсутствующие в кэше ключи загружаются одним вызовом `loader(missing)`,
+        который возвращает {ключ: значение}. Ключей, которых нет в ответе
+        загрузчика, нет и в результате.
+        """
+        found = {}
+        missing = []
+        for key in keys:
+            value = self.get(key, _MISSING)
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+
+        if missing:
+            marks = {key: self._begin_load(key) for key in missing}
+            try:
+                loaded = await loader(missing)
+            except BaseException:
+                for key, mark in marks.items():
+                    self._end_load(key, mark)
+                raise
+            for key, mark in marks.items():
+                if self._end_load(key, mark) and key in loaded:
+                    self.set(key, loaded[key], ttl)
+            found.update(loaded)
+        return found
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "loads": self._single_flight.leaders,
+            "loads_shared": self._single_flight.shared,
+        }
@@ -5,65 +5,72 @@ from fastapi import Depends
 from fastapi.security import OAuth2PasswordRequestForm
 
 from ..schemas import RegistrationScheme, TokenScheme, UserRead
+from ..logs import log_event
 from ..settings import settings
+from .base_client import BaseServiceClient
 
-logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
 
 
-class AuthServiceClient:
+class AuthServiceClient(BaseServiceClient):
+    service_name = "auth"
+
     def __init__(self):
-        self.base_url = f"{settings.AUTH_SERVICE_URL}"
-        self.timeout = 30.0
+        super().__init__(f"{settings.AUTH_SERVICE_URL}")
 
     async def register(self, user_data: RegistrationScheme) -> UserRead:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/register/",
-                json=user_data.model_dump(),
-                timeout=self.timeout,
-            )
-            try:
-                response.raise_for_status()
-            except httpx.HTTPStatusError as e:
-                logging.debug(f"Register failed: {response.text}")
-                raise e
-            return UserRead(**response.json())
+        response = await self._request(
+            "POST",
+            "/register/",
+            json=user_data.model_dump(),
+        )
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            log_event(logger, logging.INFO, "register_failed", status=response.status_code, body=response.text)
+            raise e
+        return UserRead(**response.json())
 
-    async def login(self, user_data: OAuth2PasswordRequestForm = Depends()):
-        async with httpx.AsyncClient() as client:
-            data = {
-                "username": user_data.username,
-                "password": user_data.password,
-                "grant_type": "password",
-                "scope": user_data.scopes or "",
-            }
+    async def login(self, user_data: OAuth2PasswordRequestForm = Depends(), client_ip: str | None = None):
+        data = {
+            "username": user_data.username,
+            "password": user_data.password,
+            "grant_type": "password",
+            "scope": user_data.scopes or "",
+        }
 
-            response = await client.post(
-                f"{self.base_url}/login/",
-                data=data,
-                timeout=self.timeout,
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
-            )
+        response = await self._request(
+            "POST",
+            "/login/",
+            data=data,
+            headers={
+                "Content-Type": "application/x-www-form-urlencoded",
+                # AuthService ограничивает неудачные входы по IP клиента
+                **({"X-Forwarded-For": client_ip} if client_ip else {}),
+            },
+        )
         try:
             response.raise_for_status()
         except httpx.HTTPStatusError as e:
-            logging.debug(f"Login failed: {response.text}")
+            log_event(logger, logging.INFO, "login_failed", status=response.status_code, body=response.text)
             raise e
         return response.json()
 
     async def refresh_token(self, refresh_token: str):
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/refresh/",
-                data={"refresh_token": refresh_token},
-                timeout=self.timeout,
-            )
-            try:
-                response.raise_for_status()
-            except httpx.HTTPStatusError as e:
-                logging.debug(f"Refresh token failed: {response.text}")
-                raise e
-            return response.json()
+        response = await self._request(
+            "POST",
+            "/refresh/",
+            data={"refresh_token": refresh_token},
+        )
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            log_event(logger, logging.INFO, "refresh_token_failed", status=response.status_code, body=response.text)
+            raise e
+        return response.json()
+
+    async def get_jwks(self) -> httpx.Response:
+        return await self._request("GET", "/.well-known/jwks.json")
 
 
 auth_client = AuthServiceClient()
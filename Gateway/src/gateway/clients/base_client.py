@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import time
+
+import httpx
+
+from ..cache import SingleFlight
+from ..logs import log_event
+from ..metrics import downstream_request_duration, downstream_requests
+from ..settings import settings
+from .circuit_breaker import OPEN, CircuitBreaker, DownstreamUnavailable, RetryBudget
+
+# повторять можно только идемпотентные запросы
+RETRYABLE_METHODS = {"GET"}
+
+logger = logging.getLogger(__name__)
+
+
+class BaseServiceClient:
+    """Базовый клиент микросервиса с одним долгоживущим пулом соединений.
+
+    Пул создаётся в lifespan приложения (`start`) и закрывается при остановке
+    (`close`), все запросы к сервису идут через `_request`. Там же работают
+    размыкатель цепи и бюджет повторов: если сервис недоступен, вызывающий
+    сразу получает `DownstreamUnavailable` вместо ожидания таймаута.
+    Одинаковые GET-запросы, выполняющиеся одновременно, объединяются в один.
+    """
+
+    service_name: str = ""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self._client: httpx.AsyncClient | None = None
+
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._requests_total = 0
+
+        self.breaker = CircuitBreaker(
+            self.service_name,
+            failure_threshold=settings.BREAKER_FAILURE_THRESHOLD,
+            recovery_timeout=settings.BREAKER_RECOVERY_TIMEOUT,
+            half_open_max_calls=settings.BREAKER_HALF_OPEN_MAX_CALLS,
+        )
+        self.retry_budget = RetryBudget(
+            ratio=settings.RETRY_BUDGET_RATIO,
+            min_per_second=settings.RETRY_BUDGET_MIN_PER_SECOND,
+            max_tokens=settings.RETRY_BUDGET_MAX_TOKENS,
+        )
+        self._coalescer = SingleFlight()
+
+    def _build_client(self) -> httpx.AsyncClient:
+        max_connections = settings.HTTP_POOL_PER_SERVICE.get(
+            self.service_name, settings.HTTP_POOL_MAX_CONNECTIONS
+        )
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=min(
+                settings.HTTP_POOL_MAX_KEEPALIVE, max_connections
+            ),
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(
+            connect=settings.HTTP_CONNECT_TIMEOUT,
+            read=settings.HTTP_READ_TIMEOUT,
+            write=settings.HTTP_WRITE_TIMEOUT,
+            pool=settings.HTTP_POOL_TIMEOUT,
+        )
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=limits,
+            timeout=timeout,
+        )
+
+    async def start(self):
+        if self._client is None:
+            self._client = self._build_client()
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # ленивое создание, если клиент используется вне lifespan
+        if self._client is None:
+            self._client = self._build_client()
+        return self._client
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        # объединяем только запросы без тела и своих заголовков,
+        # ответ одного вызова отдаётся всем ожидающим
+        if method == "GET" and settings.COALESCE_GET_REQUESTS and set(kwargs) <= {"params"}:
+            params = kwargs.get("params") or {}
+            key = (method, path, tuple(sorted(params.items())))
+            return await self._coalescer.do(
+                key, lambda: self._send(method, path, **kwargs)
+            )
+        return await self._send(method, path, **kwargs)
+
+    async def _send(self, method: str, path: str, **kwargs) -> httpx.Response:
+        self.retry_budget.deposit()
+        retries = 0
+        while True:
+            try:
+                response = await self._attempt(method, path, **kwargs)
+            except DownstreamUnavailable:
+                if not self._can_retry(method, retries):
+                    raise
+            else:
+                if response.status_code < 500 or not self._can_retry(method, retries):
+                    return response
+
+            retries += 1
+            await asyncio.sleep(settings.RETRY_BACKOFF * retries)
+
+    def _can_retry(self, method: str, retries: int) -> bool:
+        return (
+            method in RETRYABLE_METHODS
+            and self.breaker.state != OPEN
+            and retries < settings.RETRY_MAX_ATTEMPTS
+            and self.retry_budget.withdraw()
+        )
+
+    async def _attempt(
+        self, method: str, path: str, stream: bool = False, **kwargs
+    ) -> httpx.Response:
+        if not self.breaker.allow():
+            raise DownstreamUnavailable(self.service_name, "circuit open")
+
+        self._in_flight += 1
+        self._requests_total += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        started = time.perf_counter()
+        try:
+            request = self.client.build_request(method, path, **kwargs)
+            response = await self.client.send(request, stream=stream)
+        except httpx.TransportError as e:
+            self.breaker.record_failure()
+            downstream_requests.inc(service=self.service_name, method=method, status="error")
+            log_event(
+                logger, logging.WARNING, "downstream_error",
+                service=self.service_name, method=method, path=path, error=type(e).__name__,
+            )
+            raise DownstreamUnavailable(self.service_name, type(e).__name__) from e
+        except BaseException:
+            self.breaker.release()
+            raise
+        finally:
+            self._in_flight -= 1
+            elapsed = time.perf_counter() - started
+            downstream_request_duration.observe(elapsed, service=self.service_name, method=method)
+
+        downstream_requests.inc(
+            service=self.service_name, method=method, status=response.status_code
+        )
+        log_event(
+            logger, logging.DEBUG, "downstream_request",
+            service=self.service_name, method=method, path=path,
+            status=response.status_code, elapsed=round(elapsed, 4),
+        )
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    @property
+    def passthrough(self) -> bool:
+        """Ответы доверенного сервиса отдаются клиенту без разбора и валидации."""
+        return self.service_name in settings.PASSTHROUGH_SERVICES
+
+    async def _stream(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """Открывает потоковый ответ, тело читается вызывающим.
+
+        Без повторов и объединения: поток нельзя ни перечитать, ни разделить.
+        Ответ с ошибкой дочитывается, закрывается и выбрасывает HTTPStatusError,
+        как и в обычном пути.
+        """
+        response = await self._attempt(method, path, stream=True, **kwargs)
+        if response.is_error:
+            await response.aread()
+            await response.aclose()
+            response.raise_for_status()
+        return response
+
+    def pool_stats(self) -> dict:
+        max_connections = settings.HTTP_POOL_PER_SERVICE.get(
+            self.service_name, settings.HTTP_POOL_MAX_CONNECTIONS
+        )
+        stats = {
+            "max_connections": max_connections,
+            "coalesced_upstream_calls": self._coalescer.leaders,
+            "coalesced_saved_calls": self._coalescer.shared,
+            "in_flight": self._in_flight,
+            "peak_in_flight": self._peak_in_flight,
+            "requests_total": self._requests_total,
+            "saturation": self._in_flight / max_connections,
+            "connections_open": 0,
+            "connections_idle": 0,
+        }
+
+        # httpx не даёт публичного доступа к пулу, читаем его аккуратно
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        if pool is not None:
+            connections = list(pool.connections)
+            stats["connections_open"] = len(connections)
+            stats["connections_idle"] = sum(1 for c in connections if c.is_idle())
+        return stats
@@ -1,30 +1,28 @@
 import logging
 
-import httpx
-from fastapi import Depends
-
 from ..settings import settings
+from .base_client import BaseServiceClient
+
+logger = logging.getLogger(__name__)
 
-logging.basicConfig(level=logging.DEBUG)
 
+class CommentServiceClient(BaseServiceClient):
+    service_name = "comment"
 
-class CommentServiceClient():
     def __init__(self):
-            self.base_url = settings.COMMENT_SERVICE_URL
-            self.timeout = 30.0
+            super().__init__(settings.COMMENT_SERVICE_URL)
     async def get_comments(
         self,
         pin_id: int,
         limit: int,
         offset: int
         ):
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/get_comments/{pin_id}",
-                params={"limit": limit, "offset": offset},
-                timeout=self.timeout,
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await self._request(
+            "GET",
+            f"/get_comments/{pin_id}",
+            params={"limit": limit, "offset": offset},
+        )
+        response.raise_for_status()
+        return response.json()
             
-comment_client = CommentServiceClient()
\ No newline at end of file
+comment_client = CommentServiceClient()
@@ -1,28 +1,95 @@
+import asyncio
 import logging
 
 import httpx
-from fastapi import Depends
 
 from ..settings import settings
+from .base_client import BaseServiceClient
 
-logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
 
 
-class PinServiceClient():
+class PinServiceClient(BaseServiceClient):
+    service_name = "pin"
+
     def __init__(self):
-            self.base_url = settings.PIN_SERVICE_URL
-            self.timeout = 30.0
+            super().__init__(settings.PIN_SERVICE_URL)
     async def get_list_of_pins(
         self,
         pin_ids: list[int]
         ):
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/list_pins",
-                json={"ids": pin_ids},
-                timeout=self.timeout
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await self._request(
+            "POST",
+            "/list_pins",
+            json={"ids": pin_ids},
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def _chunks(self, pin_ids: list[int]) -> list[list[int]]:
+        """Уникальные id (в порядке запроса), поделённые на пачки по PIN_BATCH_CHUNK_SIZE."""
+        unique_ids = list(dict.fromkeys(pin_ids))
+        chunk_size = settings.PIN_BATCH_CHUNK_SIZE
+        return [
+            unique_ids[i:i + chunk_size]
+            for i in range(0, len(unique_ids), chunk_size)
+        ]
+
+    async def get_pins(
+        self,
+        pin_ids: list[int]
+        ):
+        """Найденные пины; пачки id загружаются параллельно, не больше
+        PIN_BATCH_MAX_CONCURRENCY одновременно."""
+        semaphore = asyncio.Semaphore(settings.PIN_BATCH_MAX_CONCURRENCY)
+
+        async def load(chunk: list[int]):
+            async with semaphore:
+                return await self.get_list_of_pins(chunk)
+
+        pins = []
+        for chunk_pins in await asyncio.gather(*(load(chunk) for chunk in self._chunks(pin_ids))):
+            pins.extend(chunk_pins)
+        return pins
+
+    async def get_pins_in_order(
+        self,
+        pin_ids: list[int]
+        ):
+        """Возвращает пины в порядке запрошенных id.
+
+        Повторяющиеся id запрашиваются один раз, уникальные id делятся на пачки
+        по PIN_BATCH_CHUNK_SIZE, которые загружаются параллельно.
+        На месте ненайденного пина стоит {"id": id, "missing": True}.
+        """
+        found = {pin["id"]: pin for pin in await self.get_pins(pin_ids)}
+        return [found.get(id, {"id": id, "missing": True}) for id in pin_ids]
+
+    async def stream_pins(
+        self,
+        pin_ids: list[int]
+        ) -> list[httpx.Response]:
+        """Открывает потоковые ответы по пачкам id, по одному на пачку.
+
+        Если хотя бы одна пачка не открылась, остальные закрываются,
+        а ошибка выбрасывается дальше.
+        """
+        semaphore = asyncio.Semaphore(settings.PIN_BATCH_MAX_CONCURRENCY)
+
+        async def open_stream(chunk: list[int]):
+            async with semaphore:
+                return await self._stream("POST", "/list_pins", json={"ids": chunk})
+
+        results = await asyncio.gather(
+            *(open_stream(chunk) for chunk in self._chunks(pin_ids)),
+            return_exceptions=True,
+        )
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            for result in results:
+                if isinstance(result, httpx.Response):
+                    await result.aclose()
+            raise errors[0]
+        return results
             
-pin_client = PinServiceClient()
\ No newline at end of file
+pin_client = PinServiceClient()
@@ -1,37 +1,98 @@
+import asyncio
 import logging
 
-import httpx
-from fastapi import Depends
-
+from ..cache import TTLCache
 from ..schemas import Profile, ProfileCard, ProfileComment
 from ..settings import settings
+from .base_client import BaseServiceClient
+
+logger = logging.getLogger(__name__)
 
-logging.basicConfig(level=logging.DEBUG)
 
+class UserServiceClient(BaseServiceClient):
+    service_name = "user"
 
-class UserServiceClient:
     def __init__(self):
-        self.base_url = f"{settings.USER_SERVICE_URL}"
-        self.timeout = 30.0
+        super().__init__(f"{settings.USER_SERVICE_URL}")
+        self.profile_cache = TTLCache(settings.PROFILE_CACHE_MAX_ENTRIES)
 
     async def get_profile(self, id: int):
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/profile/{id}",
-                timeout=self.timeout,
-            )
-            response.raise_for_status()
-            return response.json()
+        return await self.profile_cache.get_or_load(
+            ("profile", id),
+            lambda: self._get_json(f"/profile/{id}"),
+            settings.PROFILE_CACHE_TTL,
+        )
 
 
     async def get_profile_card(self, id: int):
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/profile/card/{id}",
-                timeout=self.timeout,
+        return await self.profile_cache.get_or_load(
+            ("card", id),
+            lambda: self._get_json(f"/profile/card/{id}"),
+            settings.PROFILE_CARD_CACHE_TTL,
+        )
+
+
+    def invalidate_profile(self, id: int):
+        """Сбрасывает закэшированные профиль и карточку пользователя."""
+        self.profile_cache.invalidate(("profile", id))
+        self.profile_cache.invalidate(("card", id))
+
+
+    async def _get_json(self, path: str):
+        response = await self._request("GET", path)
+        response.raise_for_status()
+        return response.json()
+
+
+    async def get_profile_comment(self, id: int):
+        response = await self._request("GET", f"/profile/comment/{id}")
+        response.raise_for_status()
+        return response.json()
+
+
+    async def get_profiles(self, ids: list[int]) -> dict[int, dict]:
+        return await self._get_cached_batch("profile", "/profile/batch", ids, settings.PROFILE_CACHE_TTL)
+
+
+    async def get_profile_cards(self, ids: list[int]) -> dict[int, dict]:
+        return await self._get_cached_batch("card", "/profile/card/batch", ids, settings.PROFILE_CARD_CACHE_TTL)
+
+
+    async def get_profile_comments(self, ids: list[int]) -> dict[int, dict]:
+        return await self._post_batch("/profile/comment/batch", ids)
+
+
+    async def _get_cached_batch(self, kind: str, path: str, ids: list[int], ttl: float) -> dict[int, dict]:
+        """Берёт из кэша то, что есть, остальное - одним пакетным запросом.
+
+        Записи кэша общие с get_profile/get_profile_card, поэтому
+        invalidate_profile сбрасывает и их.
+        """
+        async def load(keys):
+            loaded = await self._post_batch(path, [id for _, id in keys])
+            return {(kind, id): value for id, value in loaded.items()}
+
+        found = await self.profile_cache.get_many_or_load(
+            [(kind, id) for id in dict.fromkeys(ids)], load, ttl
+        )
+        return {id: value for (_, id), value in found.items()}
+
+
+    async def _post_batch(self, path: str, ids: list[int]) -> dict[int, dict]:
+        """{id: данные} для найденных id; пачки к UserService идут параллельно."""
+        unique_ids = list(dict.fromkeys(ids))
+        size = settings.PROFILE_BATCH_CHUNK_SIZE
+        responses = await asyncio.gather(
+            *(
+                self._request("POST", path, json={"ids": unique_ids[i:i + size]})
+                for i in range(0, len(unique_ids), size)
             )
+        )
+        result = {}
+        for response in responses:
             response.raise_for_status()
-            return response.json()
+            result.update({int(id): value for id, value in response.json().items()})
+        return result
 
 
-user_client = UserServiceClient()
\ No newline at end of file
+user_client = UserServiceClient()
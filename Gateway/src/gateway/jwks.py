@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import re
+import time
+
+from jose import JWTError, jwk
+
+from .cache import SingleFlight
+from .clients.auth_client import auth_client
+from .logs import log_event
+from .metrics import registry
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+# только асимметричные ключи: симметричный ключ из JWKS был бы публичным секретом
+ALLOWED_KEY_TYPES = {"RSA", "EC"}
+
+jwks_fetches = registry.counter(
+    "gateway_jwks_fetches_total",
+    "Загрузки набора ключей AuthService по причине и результату",
+    ("reason", "result"),
+)
+
+
+class JwksKeyCache:
+    """Ключи проверки токенов из /.well-known/jwks.json AuthService.
+
+    Набор ключей обновляется в фоне раз в max-age (или `refresh_interval`).
+    Токен с неизвестным kid вызывает внеочередную загрузку, но не чаще раза
+    в `min_refetch_interval` секунд, чтобы поток поддельных kid не превращался
+    в поток запросов к AuthService. Ключ из JWT_PUBLIC_KEY_PATH, если задан,
+    используется для токенов без kid и пока JWKS недоступен.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        refresh_interval: float,
+        min_refetch_interval: float,
+        fallback_pem: str = "",
+        fallback_algorithm: str = "",
+    ):
+        self.enabled = enabled
+        self.refresh_interval = refresh_interval
+        self.min_refetch_interval = min_refetch_interval
+        self.fallback = None
+        if fallback_pem:
+            self.fallback = (jwk.construct(fallback_pem, fallback_algorithm), fallback_algorithm)
+        if not enabled and self.fallback is None:
+            raise RuntimeError("JWKS_ENABLED=false requires JWT_PUBLIC_KEY_PATH")
+
+        self._keys: dict[str, tuple] = {}
+        self._last_fetch = float("-inf")
+        self._max_age: float | None = None
+        self._single_flight = SingleFlight()
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        if not self.enabled:
+            return
+        await self.refresh("startup")
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _refresh_loop(self):
+        while True:
+            # пока ключей нет (AuthService был недоступен), пробуем чаще
+            interval = (self._max_age or self.refresh_interval) if self._keys else self.min_refetch_interval
+            await asyncio.sleep(interval)
+            await self.refresh("scheduled")
+
+    async def refresh(self, reason: str) -> bool:
+        """Загружает набор ключей; одновременные вызовы делают один запрос."""
+        return await self._single_flight.do("jwks", lambda: self._fetch(reason))
+
+    async def _fetch(self, reason: str) -> bool:
+        self._last_fetch = time.monotonic()
+        try:
+            response = await auth_client.get_jwks()
+            response.raise_for_status()
+            keys = self._parse(response.json())
+        except Exception as e:
+            # остаются прежние ключи, следующая попытка - по расписанию
+            jwks_fetches.inc(reason=reason, result="error")
+            log_event(logger, logging.WARNING, "jwks_fetch_failed", reason=reason, error=type(e).__name__)
+            return False
+
+        self._keys = keys
+        self._max_age = self._parse_max_age(response.headers.get("cache-control", ""))
+        jwks_fetches.inc(reason=reason, result="ok")
+        return True
+
+    @staticmethod
+    def _parse(data: dict) -> dict[str, tuple]:
+        keys = {}
+        for key_data in data.get("keys", []):
+            kid, algorithm = key_data.get("kid"), key_data.get("alg")
+            if not kid or not algorithm or key_data.get("kty") not in ALLOWED_KEY_TYPES:
+                continue
+            try:
+                keys[kid] = (jwk.construct(key_data, algorithm), algorithm)
+            except JWTError:
+                log_event(logger, logging.WARNING, "jwks_key_invalid", kid=kid)
+        return keys
+
+    def _parse_max_age(self, cache_control: str) -> float | None:
+        match = re.search(r"max-age=(\d+)", cache_control)
+        if not match:
+            return None
+        # не реже, чем задано в настройках
+        return min(float(match.group(1)), self.refresh_interval)
+
+    async def keys_for(self, kid: str | None) -> list[tuple]:
+        """Ключи, которыми можно проверить токен с данным kid."""
+        if not self.enabled:
+            return [self.fallback]
+        if kid is None:
+            if self.fallback:
+                return [self.fallback]
+            return list(self._keys.values())
+
+        key = self._keys.get(kid)
+        if key is not None:
+            return [key]
+
+        # ключ мог появиться после ротации - перечитываем набор, но с ограничением
+        if time.monotonic() - self._last_fetch >= self.min_refetch_interval:
+            await self.refresh("unknown_kid")
+            key = self._keys.get(kid)
+            if key is not None:
+                return [key]
+        return [self.fallback] if self.fallback and not self._keys else []
+
+    def stats(self) -> dict:
+        return {"keys": len(self._keys), "fallback": self.fallback is not None}
+
+
+jwks_cache = JwksKeyCache(
+    enabled=settings.JWKS_ENABLED,
+    refresh_interval=settings.JWKS_REFRESH_INTERVAL,
+    min_refetch_interval=settings.JWKS_MIN_REFETCH_INTERVAL,
+    fallback_pem=settings.JWT_PUBLIC_KEY,
+    fallback_algorithm=settings.JWT_ALGORITHM,
+)
@@ -0,0 +1,22 @@
+import json
+import logging
+import random
+
+from .settings import settings
+
+
+def log_event(logger: logging.Logger, level: int, event: str, sample_rate: float | None = None, **fields):
+    """Пишет событие одной JSON-строкой, на горячем пути - только часть событий.
+
+    Уровень проверяется до форматирования, так что выключенные события
+    почти ничего не стоят. Выборка применяется только к событиям ниже INFO,
+    ошибки и предупреждения пишутся всегда. `sample_rate` по умолчанию
+    берётся из LOG_SAMPLE_RATE.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    if level < logging.INFO:
+        rate = settings.LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+        if rate < 1.0 and random.random() >= rate:
+            return
+    logger.log(level, json.dumps({"event": event, **fields}, ensure_ascii=False, default=str))
@@ -1,27 +1,71 @@
-from typing import List
+import hmac
+import logging
+from typing import Dict, List
 from contextlib import asynccontextmanager
 
 import httpx
-from fastapi import Depends, FastAPI, HTTPException, Request, Response
+from fastapi import APIRouter, Depends, FastAPI, Header, HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel
 
+from .aggregation import load_pin_page
 from .clients.pin_client import pin_client
-from .auth import get_current_user
+from .metrics import MetricsMiddleware, registry
+from .passthrough import join_json_arrays, stream_response
+from .ratelimit import InMemoryBackend, RateLimitMiddleware, RedisBackend, resolve_client_ip
+from .auth import get_current_user, token_cache
+from .jwks import jwks_cache
 from .clients.auth_client import auth_client
+from .clients.circuit_breaker import DownstreamUnavailable
 from .clients.user_client import user_client
 from .clients.comment_client import comment_client
-from .schemas import RegistrationScheme, TokenScheme, UserRead, Profile, ProfileCard
+from .settings import settings
+from .schemas import RegistrationScheme, TokenScheme, UserRead, Profile, ProfileCard, PinPage, PinBatch
 
 from fastapi.middleware.cors import CORSMiddleware
 
+logging.basicConfig(level=settings.LOG_LEVEL)
+# httpx пишет INFO на каждый запрос к микросервисам
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logging.getLogger("httpcore").setLevel(logging.WARNING)
+
+service_clients = (auth_client, user_client, comment_client, pin_client)
+
+if settings.RATE_LIMIT_BACKEND == "redis":
+    rate_limit_backend = RedisBackend(settings.RATE_LIMIT_REDIS_URL)
+else:
+    rate_limit_backend = InMemoryBackend(settings.RATE_LIMIT_MAX_KEYS)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    for client in service_clients:
+        await client.start()
+    await jwks_cache.start()
     yield
+    await jwks_cache.close()
+    for client in service_clients:
+        await client.close()
+    if isinstance(rate_limit_backend, RedisBackend):
+        await rate_limit_backend.close()
 
 
 app = FastAPI(lifespan=lifespan)
 
+# порядок: метрики -> CORS -> ограничение частоты -> приложение,
+# чтобы ответы 429 попадали в метрики и имели CORS-заголовки
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(
+        RateLimitMiddleware,
+        backend=rate_limit_backend,
+        ip_limit=settings.RATE_LIMIT_IP,
+        user_limit=settings.RATE_LIMIT_USER,
+        route_limits=settings.RATE_LIMIT_ROUTES,
+        exempt_paths=settings.RATE_LIMIT_EXEMPT_PATHS,
+        trusted_proxies=settings.RATE_LIMIT_TRUSTED_PROXIES,
+    )
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins= [
@@ -35,6 +79,62 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+
+
+BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def collect_service_stats():
+    pools = {client.service_name: client.pool_stats() for client in service_clients}
+    for field, type, documentation in (
+        ("in_flight", "gauge", "Активные запросы в пуле соединений сервиса"),
+        ("peak_in_flight", "gauge", "Максимум одновременных запросов к сервису"),
+        ("max_connections", "gauge", "Лимит соединений пула сервиса"),
+        ("saturation", "gauge", "Доля занятых соединений пула"),
+        ("connections_open", "gauge", "Открытые соединения пула"),
+        ("connections_idle", "gauge", "Простаивающие соединения пула"),
+        ("coalesced_saved_calls", "counter", "Запросы, объединённые с уже выполняющимися"),
+    ):
+        name = f"gateway_pool_{field}" + ("_total" if type == "counter" else "")
+        yield name, type, documentation, [
+            ({"service": service}, stats[field]) for service, stats in pools.items()
+        ]
+
+    yield "gateway_breaker_state", "gauge", "Состояние размыкателя: 0 closed, 1 half_open, 2 open", [
+        ({"service": client.service_name}, BREAKER_STATES[client.breaker.state])
+        for client in service_clients
+    ]
+    yield "gateway_breaker_rejected_total", "counter", "Запросы, отклонённые размыкателем", [
+        ({"service": client.service_name}, client.breaker.rejected)
+        for client in service_clients
+    ]
+    yield "gateway_retries_total", "counter", "Повторные запросы к сервису", [
+        ({"service": client.service_name}, client.retry_budget.retries)
+        for client in service_clients
+    ]
+
+    caches = {"profile": user_client.profile_cache.stats(), "jwt": token_cache.stats()}
+    for field in ("hits", "misses", "evictions"):
+        yield f"gateway_cache_{field}_total", "counter", f"Кэш: {field}", [
+            ({"cache": cache}, stats[field]) for cache, stats in caches.items()
+        ]
+    yield "gateway_cache_entries", "gauge", "Кэш: число записей", [
+        ({"cache": cache}, stats["entries"]) for cache, stats in caches.items()
+    ]
+
+
+registry.add_collector(collect_service_stats)
+
+
+@app.exception_handler(DownstreamUnavailable)
+async def downstream_unavailable_handler(request: Request, exc: DownstreamUnavailable):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"Service {exc.service} is unavailable"},
+        headers={"Retry-After": str(int(settings.BREAKER_RECOVERY_TIMEOUT))},
+    )
+
 #AuthService
 
 @app.post("/auth/register", response_model=UserRead, tags=["Auth"])
@@ -43,15 +143,32 @@ async def register_user(user_data: RegistrationScheme):
         return await auth_client.register(user_data=user_data)
     except httpx.HTTPStatusError as e:
         error_json = e.response.json()
+        retry_after = e.response.headers.get("retry-after")
         raise HTTPException(
-            status_code=e.response.status_code, detail=error_json["detail"]
+            status_code=e.response.status_code,
+            detail=error_json["detail"],
+            headers={"Retry-After": retry_after} if retry_after else None,
         )
 
 
+def forwarded_for(request: Request) -> str | None:
+    """X-Forwarded-For для микросервисов: пришедшая цепочка и адрес клиента последним.
+
+    Микросервисы берут последний адрес, поэтому туда пишется клиент,
+    определённый так же, как для ограничителя частоты.
+    """
+    peer = request.client.host if request.client else None
+    forwarded = request.headers.get("x-forwarded-for")
+    client = resolve_client_ip(forwarded, peer, settings.RATE_LIMIT_TRUSTED_PROXIES)
+    if forwarded and client:
+        return f"{forwarded}, {client}"
+    return client
+
+
 @app.post("/auth/login",  tags=["Auth"], response_model=TokenScheme)
-async def login(response: Response, user_data: OAuth2PasswordRequestForm = Depends()):
+async def login(request: Request, response: Response, user_data: OAuth2PasswordRequestForm = Depends()):
     try:
-        data = await auth_client.login(user_data=user_data)
+        data = await auth_client.login(user_data=user_data, client_ip=forwarded_for(request))
         access_token = data["access_token"]
         refresh_token = data["refresh_token"]
         token_type = data.get("type", "bearer")
@@ -68,8 +185,11 @@ async def login(response: Response, user_data: OAuth2PasswordRequestForm = Depen
         return TokenScheme(access_token=access_token, token_type=token_type)
     except httpx.HTTPStatusError as e:
         error_json = e.response.json()
+        retry_after = e.response.headers.get("retry-after")
         raise HTTPException(
-            status_code=e.response.status_code, detail=error_json["detail"]
+            status_code=e.response.status_code,
+            detail=error_json["detail"],
+            headers={"Retry-After": retry_after} if retry_after else None,
         )
 
 
@@ -105,6 +225,54 @@ async def read_me(current_user=Depends(get_current_user)):
     return current_user
 
 
+async def require_internal_token(x_internal_token: str | None = Header(None)):
+    """Доступ к /internal/* только с общим секретом INTERNAL_API_TOKEN."""
+    expected = settings.INTERNAL_API_TOKEN
+    if not expected or not x_internal_token or not hmac.compare_digest(x_internal_token, expected):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+
+
+internal = APIRouter(prefix="/internal", tags=["Internal"], dependencies=[Depends(require_internal_token)])
+
+
+@internal.get("/stats", summary="Статистика пулов соединений к микросервисам")
+async def internal_stats():
+    return {
+        "pools": {client.service_name: client.pool_stats() for client in service_clients},
+        "breakers": {
+            client.service_name: {
+                **client.breaker.stats(),
+                "retry_budget": client.retry_budget.stats(),
+            }
+            for client in service_clients
+        },
+        "caches": {
+            "profile": user_client.profile_cache.stats(),
+            "jwt": token_cache.stats(),
+        },
+        "jwks": jwks_cache.stats(),
+    }
+
+
+@app.get(
+    "/metrics",
+    tags=["Internal"],
+    summary="Метрики в формате Prometheus",
+    dependencies=[Depends(require_internal_token)],
+)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@internal.post("/cache/profile/{id}/invalidate", summary="Сбрасывает кэш профиля после его изменения")
+async def invalidate_profile_cache(id: int):
+    user_client.invalidate_profile(id)
+    return {"invalidated": id}
+
+
+app.include_router(internal)
+
+
 #UserService
 @app.get("/user/profile/{id}", tags=["Profile"], response_model=Profile, summary="Возвращает данные для основного профиля")
 async def get_profile(id: int):
@@ -129,6 +297,8 @@ async def get_comments(
     offset: int = 0,
     ):
     try:
+        # GET не проксируется потоком: буферизованный путь объединяет
+        # одинаковые запросы и повторяет их при сбоях
         return await comment_client.get_comments(pin_id,limit,offset)
     except httpx.HTTPStatusError as e:
         detail = {"detail": e.response.text or "Ошибка получения коммента"}
@@ -140,8 +310,58 @@ class IdRequest(BaseModel):
        
 @app.post("/get_list_of_pins")
 async def get_list_of_pins(pins: IdRequest):
+    if len(pins.ids) > settings.PIN_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Too many ids, max {settings.PIN_BATCH_MAX_IDS}",
+        )
     try:
-        return await pin_client.get_list_of_pins(pins.ids)
+        if pin_client.passthrough:
+            responses = await pin_client.stream_pins(pins.ids)
+            if len(responses) == 1:
+                return stream_response(responses[0])
+            return await join_json_arrays(responses)
+        return await pin_client.get_pins(pins.ids)
     except httpx.HTTPStatusError as e:
         detail = {"detail": e.response.text or "Ошибка получения списка пинов"}
-        raise HTTPException(status_code=e.response.status_code)
\ No newline at end of file
+        raise HTTPException(status_code=e.response.status_code)
+
+
+@app.post("/get_pins_batch", tags=["Pin"], response_model=PinBatch, summary="Возвращает пины в порядке запрошенных id")
+async def get_pins_batch(pins: IdRequest):
+    if len(pins.ids) > settings.PIN_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Too many ids, max {settings.PIN_BATCH_MAX_IDS}",
+        )
+    try:
+        ordered = await pin_client.get_pins_in_order(pins.ids)
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code)
+    missing = list(dict.fromkeys(pin["id"] for pin in ordered if pin.get("missing")))
+    return PinBatch(pins=ordered, missing=missing)
+
+
+@app.post("/user/profile/card/batch", tags=["Profile"], response_model=Dict[int, ProfileCard], summary="Возвращает карточки профилей по списку id: {id: карточка}")
+async def get_profile_cards_batch(users: IdRequest):
+    if len(users.ids) > settings.PROFILE_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Too many ids, max {settings.PROFILE_BATCH_MAX_IDS}",
+        )
+    try:
+        return await user_client.get_profile_cards(users.ids)
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code)
+
+
+@app.get("/pin_page/{pin_id}", tags=["Pin"], response_model=PinPage, summary="Возвращает пин, комментарии и профили авторов одним запросом")
+async def get_pin_page(
+    pin_id: int,
+    limit: int = 3,
+    offset: int = 0,
+    ):
+    page = await load_pin_page(pin_id, limit, offset)
+    if page is None:
+        raise HTTPException(status_code=404, detail=f"Pin {pin_id} not found")
+    return page
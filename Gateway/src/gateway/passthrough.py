@@ -0,0 +1,52 @@
+import httpx
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+
+# заголовки ответа микросервиса, которые имеет смысл отдать клиенту как есть;
+# hop-by-hop заголовки (connection, transfer-encoding и т.д.) не передаются
+PASSTHROUGH_HEADERS = (
+    "content-type",
+    "content-length",
+    "content-encoding",
+    "cache-control",
+    "etag",
+    "last-modified",
+)
+
+
+def stream_response(response: httpx.Response) -> StreamingResponse:
+    """Отдаёт тело ответа микросервиса клиенту без разбора JSON.
+
+    Байты читаются из пула соединений по мере отправки, соединение
+    возвращается в пул после того, как тело отдано целиком.
+    """
+    headers = {
+        name: response.headers[name]
+        for name in PASSTHROUGH_HEADERS
+        if name in response.headers
+    }
+    return StreamingResponse(
+        response.aiter_raw(),
+        status_code=response.status_code,
+        headers=headers,
+        background=BackgroundTask(response.aclose),
+    )
+
+
+async def join_json_arrays(responses: list[httpx.Response]) -> Response:
+    """Склеивает JSON-массивы из нескольких ответов в один без разбора JSON.
+
+    Тела читаются целиком (уже распакованными) и закрываются, от каждого
+    берётся содержимое между скобками.
+    """
+    parts = []
+    try:
+        for response in responses:
+            body = (await response.aread()).strip()
+            inner = body[1:-1].strip()
+            if inner:
+                parts.append(inner)
+    finally:
+        for response in responses:
+            await response.aclose()
+    return Response(b"[" + b",".join(parts) + b"]", media_type="application/json")
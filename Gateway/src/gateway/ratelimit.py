@@ -0,0 +1,229 @@
+import json
+import logging
+import math
+import re
+import time
+from collections import OrderedDict
+
+from .auth import decode_token
+from .logs import log_event
+from .metrics import registry
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis нужен только для общего бэкенда
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+rate_limited_requests = registry.counter(
+    "gateway_rate_limited_total",
+    "Запросы, отклонённые ограничителем частоты",
+    ("scope",),
+)
+
+
+def resolve_client_ip(forwarded: str | None, peer: str | None, trusted_proxies: int) -> str | None:
+    """Адрес клиента по X-Forwarded-For за `trusted_proxies` доверенными прокси.
+
+    Цепочка - адреса из заголовка и адрес соединения. Последние
+    `trusted_proxies` её звеньев - наши прокси, адрес перед ними - первый,
+    который дописал не клиент. Всё левее клиент мог подставить сам.
+    """
+    if trusted_proxies <= 0 or not forwarded:
+        return peer
+    chain = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    if peer:
+        chain.append(peer)
+    if not chain:
+        return peer
+    return chain[max(0, len(chain) - 1 - trusted_proxies)]
+
+
+def parse_limit(limit: str) -> tuple[float, float]:
+    """'5/60' -> (скорость пополнения в токенах/сек, ёмкость корзины)."""
+    count, period = limit.split("/")
+    count = float(count)
+    return count / float(period), count
+
+
+class InMemoryBackend:
+    """Корзины токенов в памяти процесса.
+
+    Обходится без блокировок: весь код между чтением и записью корзины
+    синхронный, а event loop однопоточный. Число корзин ограничено,
+    давно не использовавшиеся вытесняются.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, list[float]] = OrderedDict()
+
+    def take(self, key: str, rate: float, capacity: float) -> float:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [capacity, now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return 0.0
+        return (1.0 - bucket[0]) / rate
+
+    async def acquire(self, key: str, rate: float, capacity: float) -> float:
+        """Возвращает 0, если запрос разрешён, иначе через сколько секунд повторить."""
+        return self.take(key, rate, capacity)
+
+
+# Корзина токенов одной командой на стороне Redis, время берётся с сервера,
+# чтобы реплики gateway с разными часами считали одинаково.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(retry_after)
+"""
+
+
+class RedisBackend:
+    """Общие для всех реплик gateway корзины в Redis (или совместимом хранилище)."""
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        if aioredis is None:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package")
+        self.prefix = prefix
+        self._redis = aioredis.from_url(url)
+        self._script = self._redis.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def acquire(self, key: str, rate: float, capacity: float) -> float:
+        try:
+            result = await self._script(keys=[self.prefix + key], args=[rate, capacity])
+        except Exception as e:
+            # недоступность хранилища не должна класть gateway
+            log_event(logger, logging.WARNING, "rate_limit_backend_error", error=type(e).__name__)
+            return 0.0
+        return float(result)
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+class RateLimitMiddleware:
+    """ASGI middleware с ограничением частоты по IP, пользователю и маршруту.
+
+    Каждый запрос берёт токен из корзины IP, корзины пользователя (если передан
+    валидный access-токен) и, если для маршрута задан лимит, из корзины
+    маршрута для этого пользователя или IP. При нехватке токенов отвечает 429.
+    """
+
+    def __init__(
+        self,
+        app,
+        backend,
+        ip_limit: str,
+        user_limit: str,
+        route_limits: dict[str, str],
+        exempt_paths: list[str],
+        trusted_proxies: int = 0,
+    ):
+        self.app = app
+        self.backend = backend
+        self.ip_limit = parse_limit(ip_limit)
+        self.user_limit = parse_limit(user_limit)
+        # шаблон маршрута -> (регулярное выражение пути, лимит)
+        self.route_limits = [
+            (template, self._compile(template), parse_limit(limit))
+            for template, limit in route_limits.items()
+        ]
+        self.exempt_paths = set(exempt_paths)
+        self.trusted_proxies = trusted_proxies
+
+    @staticmethod
+    def _compile(template: str) -> re.Pattern:
+        # /user/profile/{id} -> ^/user/profile/[^/]+$
+        parts = re.split(r"\{[^/]+\}", template)
+        return re.compile("^" + "[^/]+".join(re.escape(part) for part in parts) + "$")
+
+    def _client_ip(self, scope) -> str:
+        forwarded = None
+        if self.trusted_proxies:
+            forwarded = ", ".join(
+                value.decode("latin-1") for name, value in scope["headers"] if name == b"x-forwarded-for"
+            )
+        client = scope.get("client")
+        return resolve_client_ip(forwarded, client[0] if client else None, self.trusted_proxies) or "unknown"
+
+    async def _user_id(self, scope) -> str | None:
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() != "bearer" or not token:
+                    return None
+                payload = await decode_token(token)
+                if payload and payload.get("type") == "access":
+                    return str(payload.get("user_id"))
+                return None
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] == "OPTIONS"
+            or scope["path"] in self.exempt_paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        ip = self._client_ip(scope)
+        user_id = await self._user_id(scope)
+        identity = f"user:{user_id}" if user_id is not None else f"ip:{ip}"
+
+        checks = [("ip", f"ip:{ip}", self.ip_limit)]
+        if user_id is not None:
+            checks.append(("user", identity, self.user_limit))
+        path = scope["path"]
+        for template, regex, limit in self.route_limits:
+            if regex.match(path):
+                checks.append(("route", f"route:{template}:{identity}", limit))
+                break
+
+        for limit_scope, key, (rate, capacity) in checks:
+            retry_after = await self.backend.acquire(key, rate, capacity)
+            if retry_after > 0:
+                rate_limited_requests.inc(scope=limit_scope)
+                await self._reject(send, retry_after)
+                return
+
+        await self.app(scope, receive, send)
+
+    async def _reject(self, send, retry_after: float):
+        body = json.dumps({"detail": "Too many requests"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
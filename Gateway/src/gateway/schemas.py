@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr
-from typing import Optional
+from typing import Dict, List, Optional
 
 
 #Схемы для AuthService
@@ -42,7 +42,7 @@ class Profile(BaseModel):
 
 class ProfileComment(BaseModel):
     name: str
-    avatar_url: str
+    avatar_url: Optional[str] = None
     verificated: bool
 
 class ProfileCard(BaseModel):
@@ -55,4 +55,21 @@ class ProfileCard(BaseModel):
     description: Optional[str] = None
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+#Схемы для PinService
+class PinBatch(BaseModel):
+    #пины в порядке запрошенных id, ненайденные: {"id": id, "missing": true}
+    pins: List[dict]
+    missing: List[int]
+
+
+#Схемы агрегированных страниц
+class PinPage(BaseModel):
+    pin: Optional[dict] = None
+    comments: List[dict] = []
+    author: Optional[ProfileCard] = None
+    comment_authors: Dict[int, ProfileComment] = {}
+    #части страницы, которые не удалось получить: {"author": "timeout"}
+    errors: Dict[str, str] = {}
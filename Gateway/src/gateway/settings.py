@@ -6,15 +6,98 @@ class Settings(BaseSettings):
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.JWT_PUBLIC_KEY = self._load_key(self.JWT_PUBLIC_KEY_PATH)
+        if self.JWT_PUBLIC_KEY_PATH:
+            self.JWT_PUBLIC_KEY = self._load_key(self.JWT_PUBLIC_KEY_PATH)
 
-    #jwt для декодирования токенов (RSA256)
-    JWT_PUBLIC_KEY_PATH: str 
-    JWT_ALGORITHM: str
+    #jwt для декодирования токенов: ключи берутся из JWKS AuthService,
+    #ключ из файла (необязательный) - для токенов без kid и на время недоступности JWKS
+    JWT_PUBLIC_KEY_PATH: str = ""
+    JWT_ALGORITHM: str = "RS256"
     JWT_PUBLIC_KEY: str = ""
+    JWKS_ENABLED: bool = True
+    #период фонового обновления (не реже max-age из ответа) и минимальный
+    #интервал между внеочередными загрузками из-за неизвестного kid
+    JWKS_REFRESH_INTERVAL: float = 300.0
+    JWKS_MIN_REFETCH_INTERVAL: float = 10.0
+    #кэш проверенных токенов (0 - выключен)
+    JWT_CACHE_MAX_ENTRIES: int = 50000
+
+    #логирование: уровень и доля DEBUG-событий горячего пути, которые пишутся в лог
+    LOG_LEVEL: str = "INFO"
+    LOG_SAMPLE_RATE: float = 0.01
+
+    #ограничение частоты запросов, лимиты в формате "запросов/секунд"
+    RATE_LIMIT_ENABLED: bool = True
+    #memory - в памяти процесса, redis - общий для всех реплик
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/0"
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    RATE_LIMIT_IP: str = "100/1"
+    RATE_LIMIT_USER: str = "50/1"
+    #лимиты маршрутов на пользователя или IP, ключ - шаблон пути
+    RATE_LIMIT_ROUTES: dict[str, str] = {
+        "/auth/login": "5/60",
+        "/auth/register": "5/60",
+        "/get_list_of_pins": "20/1",
+        "/get_pins_batch": "20/1",
+    }
+    RATE_LIMIT_EXEMPT_PATHS: list[str] = ["/internal/stats"]
+    #сколько доверенных прокси стоит перед gateway: IP клиента берётся из
+    #X-Forwarded-For на столько звеньев левее адреса соединения; 0 - заголовок не читается
+    RATE_LIMIT_TRUSTED_PROXIES: int = 0
 
     #настройка микросервисов (gateway)
 
+    #пул соединений к микросервисам (один клиент на сервис)
+    HTTP_POOL_MAX_CONNECTIONS: int = 100
+    HTTP_POOL_MAX_KEEPALIVE: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    #лимит соединений для отдельного сервиса, например {"user": 200}
+    HTTP_POOL_PER_SERVICE: dict[str, int] = {}
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_READ_TIMEOUT: float = 10.0
+    HTTP_WRITE_TIMEOUT: float = 10.0
+    HTTP_POOL_TIMEOUT: float = 5.0
+    #объединять одинаковые одновременные GET-запросы в один
+    COALESCE_GET_REQUESTS: bool = True
+    #сервисы, чьи большие POST-ответы (списки) проксируются потоком без повторной
+    #валидации; GET всегда идут буферизованным путём с объединением и повторами
+    PASSTHROUGH_SERVICES: list[str] = ["pin"]
+
+    #размыкатель цепи и бюджет повторов (на каждый сервис)
+    BREAKER_FAILURE_THRESHOLD: int = 5
+    BREAKER_RECOVERY_TIMEOUT: float = 10.0
+    BREAKER_HALF_OPEN_MAX_CALLS: int = 1
+    RETRY_MAX_ATTEMPTS: int = 2
+    RETRY_BACKOFF: float = 0.05
+    #доля повторов от числа запросов и минимальный запас повторов в секунду
+    RETRY_BUDGET_RATIO: float = 0.2
+    RETRY_BUDGET_MIN_PER_SECOND: float = 1.0
+    RETRY_BUDGET_MAX_TOKENS: float = 10.0
+
+    #таймауты частей страницы пина (/pin_page), секунды
+    PIN_PAGE_PIN_TIMEOUT: float = 2.0
+    PIN_PAGE_COMMENTS_TIMEOUT: float = 2.0
+    PIN_PAGE_AUTHOR_TIMEOUT: float = 1.0
+    PIN_PAGE_COMMENT_AUTHORS_TIMEOUT: float = 1.0
+
+    #общий секрет для /internal/* (заголовок X-Internal-Token); пустой - эндпоинты закрыты
+    INTERNAL_API_TOKEN: str = ""
+
+    #кэш профилей UserService (TTL в секундах, 0 - не кэшировать)
+    PROFILE_CACHE_MAX_ENTRIES: int = 10000
+    PROFILE_CACHE_TTL: float = 30.0
+    PROFILE_CARD_CACHE_TTL: float = 60.0
+    #пакетная загрузка профилей: максимум id в запросе к gateway и размер
+    #пачки к UserService (не больше его PROFILE_BATCH_MAX_IDS)
+    PROFILE_BATCH_MAX_IDS: int = 1000
+    PROFILE_BATCH_CHUNK_SIZE: int = 200
+
+    #пакетная загрузка пинов (/get_list_of_pins, /get_pins_batch)
+    PIN_BATCH_MAX_IDS: int = 1000
+    PIN_BATCH_CHUNK_SIZE: int = 100
+    PIN_BATCH_MAX_CONCURRENCY: int = 4
+
     #AuthService
     AUTH_SERVICE_HOST: str
     AUTH_SERVICE_PORT: str
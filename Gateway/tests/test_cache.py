@@ -0,0 +1,39 @@
+import asyncio
+
+from gateway.cache import TTLCache
+
+
+def test_invalidate_drops_only_load_of_that_key():
+    async def scenario():
+        cache = TTLCache(100)
+        release = asyncio.Event()
+
+        async def slow(value):
+            await release.wait()
+            return value
+
+        a = asyncio.create_task(cache.get_or_load("a", lambda: slow(1), 60))
+        b = asyncio.create_task(cache.get_or_load("b", lambda: slow(2), 60))
+        # даём загрузкам начаться: инвалидация до старта загрузки её не касается
+        for _ in range(3):
+            await asyncio.sleep(0)
+        cache.invalidate("a")
+        release.set()
+        assert await a == 1 and await b == 2
+        return cache.get("a"), cache.get("b")
+
+    assert asyncio.run(scenario()) == (None, 2)
+
+
+def test_get_many_skips_invalidated_keys():
+    async def scenario():
+        cache = TTLCache(100)
+
+        async def loader(keys):
+            cache.invalidate("a")
+            return {key: key.upper() for key in keys}
+
+        found = await cache.get_many_or_load(["a", "b"], loader, 60)
+        return found, cache.get("a"), cache.get("b")
+
+    assert asyncio.run(scenario()) == ({"a": "A", "b": "B"}, None, "B")
@@ -0,0 +1,27 @@
+import json
+import logging
+
+from gateway import logs
+from gateway.logs import log_event
+
+
+def test_warning_is_written_regardless_of_sample_rate(caplog, monkeypatch):
+    monkeypatch.setattr(logs.random, "random", lambda: 0.999)
+    logger = logging.getLogger("gateway.tests")
+
+    with caplog.at_level(logging.DEBUG, logger="gateway.tests"):
+        for _ in range(20):
+            log_event(logger, logging.WARNING, "downstream_error", sample_rate=0.01)
+
+    assert len(caplog.records) == 20
+    assert json.loads(caplog.records[0].getMessage()) == {"event": "downstream_error"}
+
+
+def test_debug_is_sampled(caplog, monkeypatch):
+    monkeypatch.setattr(logs.random, "random", lambda: 0.999)
+    logger = logging.getLogger("gateway.tests")
+
+    with caplog.at_level(logging.DEBUG, logger="gateway.tests"):
+        log_event(logger, logging.DEBUG, "downstream_request", sample_rate=0.01)
+
+    assert caplog.records == []
@@ -0,0 +1,19 @@
+from gateway.ratelimit import resolve_client_ip
+
+
+def test_no_trusted_proxies_ignores_forwarded():
+    assert resolve_client_ip("1.1.1.1", "10.0.0.5", 0) == "10.0.0.5"
+
+
+def test_spoofed_entries_left_of_proxy_are_ignored():
+    # клиент прислал свой X-Forwarded-For, балансировщик дописал его адрес
+    assert resolve_client_ip("6.6.6.6, 203.0.113.7", "10.0.0.2", 1) == "203.0.113.7"
+    assert resolve_client_ip("203.0.113.7", "10.0.0.2", 1) == "203.0.113.7"
+
+
+def test_two_trusted_proxies():
+    assert resolve_client_ip("6.6.6.6, 203.0.113.7, 10.0.0.3", "10.0.0.2", 2) == "203.0.113.7"
+
+
+def test_short_chain_falls_back_to_leftmost():
+    assert resolve_client_ip("203.0.113.7", "10.0.0.2", 5) == "203.0.113.7"
@@ -0,0 +1,52 @@
+"""hnsw индексы векторов
+
+Revision ID: c7e3b5a19d42
+Revises: 2e88f509dc4f
+Create Date: 2026-10-18 12:40:11.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from src.userservice.settings import settings
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e3b5a19d42'
+down_revision: Union[str, Sequence[str], None] = '2e88f509dc4f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = {
+    'ix_user_self_vector_hnsw': 'self_vector',
+    'ix_user_vector_of_interest_hnsw': 'vector_of_interest',
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY не блокирует запись в user на время построения,
+    # но не может выполняться внутри транзакции миграции
+    with op.get_context().autocommit_block():
+        for name, column in INDEXES.items():
+            op.create_index(
+                name,
+                'user',
+                [column],
+                unique=False,
+                postgresql_using='hnsw',
+                postgresql_ops={column: 'vector_cosine_ops'},
+                postgresql_with={
+                    'm': settings.VECTOR_INDEX_M,
+                    'ef_construction': settings.VECTOR_INDEX_EF_CONSTRUCTION,
+                },
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.drop_index(name, table_name='user', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,45 @@
+"""счётчики пользователя
+
+Revision ID: d3f8a6b2e417
+Revises: c7e3b5a19d42
+Create Date: 2026-10-18 13:05:27.731940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3f8a6b2e417'
+down_revision: Union[str, Sequence[str], None] = 'c7e3b5a19d42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('processed_counter_event',
+    sa.Column('event_id', sa.String(length=64), nullable=False),
+    sa.Column('processed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('event_id')
+    )
+    op.create_index(op.f('ix_processed_counter_event_processed_at'), 'processed_counter_event', ['processed_at'], unique=False)
+    # в модели collections - Integer, а первая миграция создала String;
+    # x = x + delta для строки не работает
+    op.alter_column('user', 'collections',
+               existing_type=sa.String(),
+               type_=sa.Integer(),
+               postgresql_using='collections::integer',
+               existing_nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('user', 'collections',
+               existing_type=sa.Integer(),
+               type_=sa.String(),
+               existing_nullable=True)
+    op.drop_index(op.f('ix_processed_counter_event_processed_at'), table_name='processed_counter_event')
+    op.drop_table('processed_counter_event')
@@ -0,0 +1,127 @@
+"""Чтение профилей: сущность User целиком (с векторами) против проекции колонок.
+
+Нужна база PostgreSQL с расширением vector из настроек UserService. Таблица
+создаётся в отдельной схеме bench_profile_reads, которая удаляется после
+замера. Объём данных считается на сервере как сумма pg_column_size
+выбранных колонок, то есть без учёта служебных байтов протокола.
+
+Запуск из каталога UserService:
+
+    python benchmarks/bench_profile_reads.py --users 2000 --reads 5000
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import func, insert, select, text  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+from sqlalchemy.orm import undefer_group  # noqa: E402
+
+from src.userservice import schemas  # noqa: E402
+from src.userservice.models import User  # noqa: E402
+from src.userservice.profiles import load_profile, profile_columns  # noqa: E402
+from src.userservice.settings import settings  # noqa: E402
+
+SCHEMA = "bench_profile_reads"
+
+
+def random_vector() -> list[float]:
+    return [random.random() for _ in range(512)]
+
+
+async def fill(sessionmaker, users: int):
+    rows = [
+        {
+            "id": id,
+            "username": f"user{id}",
+            "name": f"User {id}",
+            "posts": 0,
+            "followers": 0,
+            "followed": 0,
+            "collections": 0,
+            "verificated": False,
+            "Trust": 100,
+            "created_at": date.today(),
+            "vector_of_interest": random_vector(),
+            "self_vector": random_vector(),
+        }
+        for id in range(1, users + 1)
+    ]
+    async with sessionmaker() as db:
+        await db.execute(insert(User), rows)
+        await db.commit()
+
+
+async def entity_read(db, id: int):
+    """Прежнее поведение db.get(User, id): все колонки, включая векторы."""
+    result = await db.execute(
+        select(User).where(User.id == id).options(undefer_group("vectors"))
+    )
+    return result.scalar_one_or_none()
+
+
+async def projected_read(db, id: int):
+    return await load_profile(db, id, schemas.Profile)
+
+
+async def bytes_per_row(db, columns) -> float:
+    size = sum(func.coalesce(func.pg_column_size(column), 0) for column in columns)
+    return float(await db.scalar(select(func.avg(size))))
+
+
+async def run(label: str, read, sessionmaker, ids: list[int], concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(id: int):
+        async with semaphore, sessionmaker() as db:
+            await read(db, id)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(id) for id in ids))
+    rate = len(ids) / (time.perf_counter() - started)
+    print(f"{label:<40} {rate:10.0f} rows/s")
+    return rate
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_async_engine(settings.DATABASE_URL_asyncpg, pool_size=args.concurrency)
+    bench_engine = engine.execution_options(schema_translate_map={None: SCHEMA})
+    sessionmaker = async_sessionmaker(bind=bench_engine, expire_on_commit=False)
+
+    try:
+        async with bench_engine.begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+            await conn.run_sync(lambda sync_conn: User.__table__.create(sync_conn))
+        await fill(sessionmaker, args.users)
+
+        ids = [random.randint(1, args.users) for _ in range(args.reads)]
+        before = await run("User целиком (с векторами)", entity_read, sessionmaker, ids, args.concurrency)
+        after = await run("проекция колонок Profile", projected_read, sessionmaker, ids, args.concurrency)
+
+        async with sessionmaker() as db:
+            full_bytes = await bytes_per_row(db, list(User.__table__.columns))
+            projected_bytes = await bytes_per_row(db, profile_columns(schemas.Profile))
+        print(f"\nданных на строку: {full_bytes:.0f} -> {projected_bytes:.0f} байт")
+        print(f"ускорение: x{after / before:.1f}")
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,144 @@
+"""Похожие пользователи: точность (recall@k) и задержка hnsw против точного поиска.
+
+Нужна база PostgreSQL с расширением vector из настроек UserService. Таблица
+создаётся в отдельной схеме bench_similar_users, которая удаляется после
+замера. Векторы синтетические: кластеры вокруг случайных центров, чтобы у
+каждого пользователя были близкие соседи, как у настоящих эмбеддингов.
+
+Точный ответ считается тем же find_similar с выключенным index scan, так что
+сравниваются одинаковые запросы, отличается только план.
+
+Запуск из каталога UserService:
+
+    python benchmarks/bench_similar_users.py --users 20000 --queries 200 --ef-search 20 40 100 200
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import func, insert, select, text  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from src.userservice.models import User  # noqa: E402
+from src.userservice.settings import settings  # noqa: E402
+from src.userservice.similar import SimilarKind, find_similar  # noqa: E402
+
+SCHEMA = "bench_similar_users"
+DIM = 512
+
+
+def clustered_vectors(count: int, clusters: int, spread: float) -> list[list[float]]:
+    centers = [[random.gauss(0, 1) for _ in range(DIM)] for _ in range(clusters)]
+    return [
+        [x + random.gauss(0, spread) for x in random.choice(centers)]
+        for _ in range(count)
+    ]
+
+
+async def fill(sessionmaker, users: int, clusters: int, spread: float):
+    vectors = clustered_vectors(users, clusters, spread)
+    async with sessionmaker() as db:
+        for start in range(0, users, 1000):
+            await db.execute(
+                insert(User),
+                [
+                    {
+                        "id": id,
+                        "username": f"user{id}",
+                        "name": f"User {id}",
+                        "verificated": False,
+                        "created_at": date.today(),
+                        "self_vector": vectors[id - 1],
+                    }
+                    for id in range(start + 1, min(start + 1000, users) + 1)
+                ],
+            )
+        await db.commit()
+
+
+async def build_index(engine, m: int, ef_construction: int) -> float:
+    started = time.perf_counter()
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            f"CREATE INDEX ix_user_self_vector_hnsw ON {SCHEMA}.\"user\" "
+            f"USING hnsw (self_vector vector_cosine_ops) "
+            f"WITH (m = {m}, ef_construction = {ef_construction})"
+        ))
+    return time.perf_counter() - started
+
+
+async def search(sessionmaker, ids: list[int], k: int, ef_search: int, exact: bool):
+    """{id: множество найденных id} и задержки запросов в миллисекундах."""
+    found, latencies = {}, []
+    for id in ids:
+        async with sessionmaker() as db:
+            if exact:
+                await db.execute(select(func.set_config("enable_indexscan", "off", True)))
+            started = time.perf_counter()
+            items = await find_similar(db, id, SimilarKind.creators, k, 0, ef_search)
+            latencies.append((time.perf_counter() - started) * 1000)
+        found[id] = {item["id"] for item in items}
+    return found, latencies
+
+
+def report(label: str, latencies: list[float], recall: float | None = None):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    recall_text = f"recall@k {recall:6.3f}" if recall is not None else " " * 15
+    print(f"{label:<22} {recall_text}  p50 {statistics.median(latencies):7.2f} ms  p95 {p95:7.2f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--spread", type=float, default=0.3)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=20)
+    parser.add_argument("--m", type=int, default=settings.VECTOR_INDEX_M)
+    parser.add_argument("--ef-construction", type=int, default=settings.VECTOR_INDEX_EF_CONSTRUCTION)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[20, 40, 100, 200])
+    args = parser.parse_args()
+
+    engine = create_async_engine(settings.DATABASE_URL_asyncpg)
+    bench_engine = engine.execution_options(schema_translate_map={None: SCHEMA})
+    sessionmaker = async_sessionmaker(bind=bench_engine, expire_on_commit=False)
+
+    try:
+        async with bench_engine.begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+            await conn.run_sync(lambda sync_conn: User.__table__.create(sync_conn))
+            # индекс строится после загрузки, с параметрами из аргументов
+            await conn.execute(text(f"DROP INDEX {SCHEMA}.ix_user_self_vector_hnsw"))
+        await fill(sessionmaker, args.users, args.clusters, args.spread)
+        build_time = await build_index(engine, args.m, args.ef_construction)
+        async with engine.begin() as conn:
+            await conn.execute(text(f"ANALYZE {SCHEMA}.\"user\""))
+        print(f"{args.users} users, m={args.m}, ef_construction={args.ef_construction}: "
+              f"index built in {build_time:.1f} s\n")
+
+        ids = random.sample(range(1, args.users + 1), args.queries)
+        exact, latencies = await search(sessionmaker, ids, args.k, args.k, exact=True)
+        report("exact (seq scan)", latencies)
+
+        for ef_search in args.ef_search:
+            approx, latencies = await search(sessionmaker, ids, args.k, ef_search, exact=False)
+            recall = statistics.mean(len(approx[id] & exact[id]) / len(exact[id]) for id in ids)
+            report(f"hnsw ef_search={ef_search}", latencies, recall)
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
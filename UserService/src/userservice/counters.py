@@ -0,0 +1,30 @@
+from dataclasses import dataclass
+
+COUNTERS = ("followers", "followed", "posts", "collections")
+
+
+@dataclass
+class CounterEvent:
+    """Изменение одного счётчика пользователя на delta."""
+
+    event_id: str
+    user_id: int
+    counter: str
+    delta: int
+
+
+def aggregate(events: list[CounterEvent]) -> list[dict]:
+    """Сумма изменений по (пользователь, счётчик): строка на пользователя.
+
+    Строки упорядочены по id, чтобы UPDATE брали блокировки в одном порядке,
+    нулевые итоги (подписался и отписался) отбрасываются.
+    """
+    deltas: dict[int, dict[str, int]] = {}
+    for event in events:
+        user = deltas.setdefault(event.user_id, dict.fromkeys(COUNTERS, 0))
+        user[event.counter] += event.delta
+    return [
+        {"user_id": user_id, **user}
+        for user_id, user in sorted(deltas.items())
+        if any(user.values())
+    ]
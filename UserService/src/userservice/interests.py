@@ -0,0 +1,94 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from .settings import settings
+
+EVENT_WEIGHTS = {
+    "view": settings.INTEREST_WEIGHT_VIEW,
+    "like": settings.INTEREST_WEIGHT_LIKE,
+    "save": settings.INTEREST_WEIGHT_SAVE,
+}
+
+
+@dataclass
+class InteractionEvent:
+    """Действие пользователя с контентом.
+
+    Вектор контента берётся из события, а если его нет - self_vector
+    автора: отдельных эмбеддингов у пинов пока нет.
+    """
+
+    user_id: int
+    type: str
+    ts: float
+    author_id: int | None = None
+    vector: list[float] | None = None
+
+
+class PendingInterest:
+    """События одного пользователя, свёрнутые до записи в базу.
+
+    Каждое событие - шаг EMA: v = d * v + (1 - d) * x, где d = INTEREST_DECAY
+    в степени веса события. Цепочка шагов сводится к v = keep * v0 + Σ coef * x,
+    поэтому текущий вектор из базы нужен только при записи. keep и coef
+    в сумме всегда дают 1.
+    """
+
+    __slots__ = ("keep", "authors", "explicit", "explicit_weight")
+
+    def __init__(self):
+        self.keep = 1.0
+        self.authors: dict[int, float] = {}
+        self.explicit: np.ndarray | None = None
+        self.explicit_weight = 0.0
+
+    def add(self, event: InteractionEvent):
+        shrink = settings.INTEREST_DECAY ** EVENT_WEIGHTS[event.type]
+        alpha = 1 - shrink
+
+        self.keep *= shrink
+        for author_id in self.authors:
+            self.authors[author_id] *= shrink
+        if self.explicit is not None:
+            self.explicit *= shrink
+            self.explicit_weight *= shrink
+
+        if event.vector is not None:
+            term = alpha * np.asarray(event.vector, dtype=np.float64)
+            self.explicit = term if self.explicit is None else self.explicit + term
+            self.explicit_weight += alpha
+        else:
+            self.authors[event.author_id] = self.authors.get(event.author_id, 0.0) + alpha
+
+    def apply(self, current, author_vectors: dict[int, np.ndarray]) -> np.ndarray | None:
+        """Новый vector_of_interest или None, если менять нечего.
+
+        Событие с автором без self_vector не меняет интересы: его доля
+        переходит к текущему вектору. Пользователю без вектора достаётся
+        взвешенное среднее векторов из событий.
+        """
+        keep = self.keep
+        weight = self.explicit_weight
+        total = self.explicit.copy() if self.explicit is not None else None
+        for author_id, coef in self.authors.items():
+            vector = author_vectors.get(author_id)
+            if vector is None:
+                keep += coef
+                continue
+            total = coef * vector if total is None else total + coef * vector
+            weight += coef
+
+        if total is None or weight == 0:
+            return None
+        if current is None:
+            return total / weight
+        return keep * np.asarray(current, dtype=np.float64) + total
+
+
+def coalesce(events: list[InteractionEvent]) -> dict[int, PendingInterest]:
+    """Сворачивает события пачки по пользователям в порядке их времени."""
+    pending: dict[int, PendingInterest] = {}
+    for event in sorted(events, key=lambda event: event.ts):
+        pending.setdefault(event.user_id, PendingInterest()).add(event)
+    return pending
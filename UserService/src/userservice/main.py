@@ -1,19 +1,33 @@
-from fastapi import FastAPI, HTTPException, status, Depends
+from fastapi import FastAPI, HTTPException, Query, status, Depends
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
 from .database import engine, get_session
 from .rabbitmq.consumer_user_auth import RBCUserAuth
+from .rabbitmq.consumer_interactions import RBCInteractions
+from .rabbitmq.consumer_counters import RBCCounters
+from .metrics import registry
 import asyncio
-from sqlalchemy import select
-from .models import User
+from typing import Dict
+
+from .profiles import load_profile, load_profiles
+from .vectors import load_vectors
+from .similar import SimilarKind, find_similar
+from .settings import settings
 from ..userservice import schemas
 from sqlalchemy.ext.asyncio import AsyncSession
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     consume_task = asyncio.create_task(RBCUserAuth.start_consume())
+    interactions_task = asyncio.create_task(RBCInteractions.start_consume())
+    counters_task = asyncio.create_task(RBCCounters.start_consume())
     yield 
     consume_task.cancel()
+    interactions_task.cancel()
+    counters_task.cancel()
     await RBCUserAuth.close()
+    await RBCInteractions.close()
+    await RBCCounters.close()
     await engine.dispose()     
 
 
@@ -23,7 +37,7 @@ app = FastAPI(lifespan = lifespan)
 
 @app.get("/profile/{id}", summary="Возвращает все данные главной страницы профиля", response_model=schemas.Profile)
 async def get_profile(id: int, db: AsyncSession = Depends(get_session)):
-    profile = await db.get(User, id)
+    profile = await load_profile(db, id, schemas.Profile)
     if not profile:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
     return profile
@@ -32,14 +46,58 @@ async def get_profile(id: int, db: AsyncSession = Depends(get_session)):
 
 @app.get("/profile/comment/{id}", summary="Возвращет данные профиля коммента", response_model=schemas.ProfileComment)
 async def get_profile_comment(id: int, db: AsyncSession = Depends(get_session)):
-    profile = await db.get(User, id)
+    profile = await load_profile(db, id, schemas.ProfileComment)
     if not profile:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
     return profile
 
 @app.get("/profile/card/{id}", summary="Возвращает данные карточки профиля", response_model=schemas.ProfileCard)
 async def get_profile_card(id: int, db: AsyncSession = Depends(get_session)):
-    profile = await db.get(User, id)
+    profile = await load_profile(db, id, schemas.ProfileCard)
     if not profile:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User {id} not found")
-    return profile
\ No newline at end of file
+    return profile
+
+
+
+@app.post("/profile/batch", summary="Возвращает профили по списку id: {id: профиль}", response_model=Dict[int, schemas.Profile])
+async def get_profiles_batch(body: schemas.ProfileIds, db: AsyncSession = Depends(get_session)):
+    return await load_profiles(db, body.ids, schemas.Profile)
+
+
+@app.post("/profile/comment/batch", summary="Возвращает данные профилей для комментариев по списку id", response_model=Dict[int, schemas.ProfileComment])
+async def get_profile_comments_batch(body: schemas.ProfileIds, db: AsyncSession = Depends(get_session)):
+    return await load_profiles(db, body.ids, schemas.ProfileComment)
+
+
+@app.post("/profile/card/batch", summary="Возвращает карточки профилей по списку id", response_model=Dict[int, schemas.ProfileCard])
+async def get_profile_cards_batch(body: schemas.ProfileIds, db: AsyncSession = Depends(get_session)):
+    return await load_profiles(db, body.ids, schemas.ProfileCard)
+
+
+@app.get("/vectors/{id}", summary="Возвращает векторы пользователя (для рекомендаций)", response_model=schemas.UserVectors)
+async def get_user_vectors(id: int, db: AsyncSession = Depends(get_session)):
+    vectors = await load_vectors(db, [id])
+    if id not in vectors:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User {id} not found")
+    return vectors[id]
+
+
+@app.get("/similar/{id}", summary="Возвращает похожих пользователей по векторам", response_model=schemas.SimilarUsers)
+async def get_similar_users(
+    id: int,
+    kind: SimilarKind = SimilarKind.creators,
+    limit: int = Query(20, ge=1, le=settings.SIMILAR_USERS_MAX_LIMIT),
+    offset: int = Query(0, ge=0, le=settings.SIMILAR_USERS_MAX_OFFSET),
+    ef_search: int = Query(settings.SIMILAR_USERS_EF_SEARCH, ge=1, le=settings.SIMILAR_USERS_MAX_EF_SEARCH),
+    db: AsyncSession = Depends(get_session),
+):
+    items = await find_similar(db, id, kind, limit, offset, ef_search)
+    if items is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User {id} not found")
+    return {"items": items, "limit": limit, "offset": offset}
+
+
+@app.get("/metrics", summary="метрики в формате Prometheus")
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
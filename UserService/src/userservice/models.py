@@ -1,8 +1,10 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, BigInteger, Date, Boolean
-from sqlalchemy.orm import declarative_base
+from sqlalchemy import Column, String, Integer, ForeignKey, BigInteger, Date, DateTime, Boolean, Index, func
+from sqlalchemy.orm import declarative_base, deferred
 from pgvector.sqlalchemy import Vector
 from datetime import datetime, timezone
 
+from .settings import settings
+
 Base = declarative_base()
 
 class User(Base):
@@ -19,10 +21,33 @@ class User(Base):
     card_image2 = Column(String, nullable=True)
     collections = Column(Integer, default=0)
     verificated = Column(Boolean, default=False)
-    vector_of_interest = Column(Vector(512), nullable=True)
-    self_vector = Column(Vector(512), nullable=True)
+    # векторы (~2 КБ каждый) не загружаются вместе с пользователем,
+    # читаются явно через vectors.load_vectors
+    vector_of_interest = deferred(Column(Vector(512), nullable=True), group="vectors", raiseload=True)
+    self_vector = deferred(Column(Vector(512), nullable=True), group="vectors", raiseload=True)
     description = Column(String, nullable=True)
     Trust = Column(Integer, default=100)
     created_at = Column(Date, nullable=False, default=datetime.now(timezone.utc))
 
-    
\ No newline at end of file
+    # hnsw индексы для поиска похожих пользователей (similar.py)
+    __table_args__ = tuple(
+        Index(
+            f"ix_user_{column}_hnsw",
+            column,
+            postgresql_using="hnsw",
+            postgresql_ops={column: "vector_cosine_ops"},
+            postgresql_with={
+                "m": settings.VECTOR_INDEX_M,
+                "ef_construction": settings.VECTOR_INDEX_EF_CONSTRUCTION,
+            },
+        )
+        for column in ("self_vector", "vector_of_interest")
+    )
+
+
+class ProcessedCounterEvent(Base):
+    """Событие счётчика, уже применённое к user: повторная доставка пропускается."""
+    __tablename__ = "processed_counter_event"
+
+    event_id = Column(String(64), primary_key=True)
+    processed_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
@@ -0,0 +1,31 @@
+from pydantic import BaseModel
+from sqlalchemy import BigInteger, any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import User
+
+
+def id_in(ids: list[int]):
+    """User.id = ANY(:ids): один параметр-массив вместо IN (...) на каждый id."""
+    return User.id == any_(bindparam("ids", list(set(ids)), type_=ARRAY(BigInteger)))
+
+
+def profile_columns(schema: type[BaseModel]) -> list:
+    """Колонки User, нужные схеме ответа. Векторы в схемы профилей не входят."""
+    return [getattr(User, name) for name in schema.model_fields]
+
+
+async def load_profile(db: AsyncSession, id: int, schema: type[BaseModel]) -> dict | None:
+    """Профиль по id, только с колонками схемы."""
+    result = await db.execute(select(*profile_columns(schema)).where(User.id == id))
+    row = result.one_or_none()
+    return row._asdict() if row is not None else None
+
+
+async def load_profiles(db: AsyncSession, ids: list[int], schema: type[BaseModel]) -> dict[int, dict]:
+    """Профили по списку id одним запросом, только с колонками схемы."""
+    result = await db.execute(
+        select(User.id, *profile_columns(schema)).where(id_in(ids))
+    )
+    return {row.id: row._asdict() for row in result}
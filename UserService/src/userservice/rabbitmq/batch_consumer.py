@@ -0,0 +1,188 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+
+import aio_pika
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+logger = logging.getLogger(__name__)
+
+
+class PoisonMessage(Exception):
+    """Сообщение, которое нельзя обработать ни сейчас, ни при повторе."""
+
+
+class BatchConsumer(ABC):
+    """Потребитель, обрабатывающий сообщения пачками.
+
+    Сообщения копятся, пока их не станет `batch_size` или не пройдёт
+    `batch_timeout_ms` с первого сообщения пачки, затем пачка обрабатывается
+    одним вызовом `handle_batch` и подтверждается. При временной ошибке
+    (база недоступна) пачка через `retry_delay` секунд возвращается в очередь.
+    При любой другой ошибке сообщения обрабатываются по одному, и те, что
+    не проходят и поодиночке, уходят в очередь `dead_letter_queue` с причиной
+    в заголовках.
+
+    Наследники реализуют `parse` (тело сообщения -> данные, PoisonMessage
+    при ошибке) и `handle_batch`. `prefetch` должен быть не меньше
+    `batch_size`, иначе пачка не наберётся и будет уходить по таймауту.
+    """
+
+    def __init__(
+        self,
+        amqp_url: str,
+        queue_name: str,
+        batch_size: int,
+        batch_timeout_ms: float,
+        prefetch: int,
+        dead_letter_queue: str,
+        retry_delay: float = 1.0,
+    ):
+        self.amqp_url = amqp_url
+        self.queue_name = queue_name
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout_ms / 1000
+        self.prefetch = prefetch
+        self.dead_letter_queue = dead_letter_queue
+        self.retry_delay = retry_delay
+
+        self.connection: aio_pika.RobustConnection | None = None
+        self.channel: aio_pika.abc.AbstractChannel | None = None
+        self.queue: aio_pika.abc.AbstractQueue | None = None
+
+        self._buffer: list[aio_pika.abc.AbstractIncomingMessage] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._flush_lock = asyncio.Lock()
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def pending(self) -> int:
+        """Сообщения в незавершённой пачке."""
+        return len(self._buffer)
+
+    @abstractmethod
+    def parse(self, message: aio_pika.abc.AbstractIncomingMessage):
+        """Тело сообщения -> данные для handle_batch; PoisonMessage при ошибке."""
+
+    @abstractmethod
+    async def handle_batch(self, items: list):
+        """Обрабатывает пачку данных целиком."""
+
+    def is_transient(self, error: Exception) -> bool:
+        """Ошибка, после которой сообщение стоит вернуть в очередь."""
+        if isinstance(error, DBAPIError) and error.connection_invalidated:
+            return True
+        return isinstance(error, (OperationalError, InterfaceError, OSError, asyncio.TimeoutError))
+
+    async def connect(self):
+        self.connection = await aio_pika.connect_robust(self.amqp_url)
+        self.channel = await self.connection.channel()
+        await self.channel.set_qos(prefetch_count=self.prefetch)
+        # аргументы основной очереди не меняются: у существующей очереди
+        # их нельзя поменять без пересоздания, поэтому dead-letter - явной публикацией
+        self.queue = await self.channel.declare_queue(self.queue_name, durable=True)
+        await self.channel.declare_queue(self.dead_letter_queue, durable=True)
+
+    async def on_message(self, message: aio_pika.abc.AbstractIncomingMessage):
+        self._buffer.append(message)
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.batch_timeout, self._flush_by_timer)
+
+    def _flush_by_timer(self):
+        self._timer = None
+        task = asyncio.create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+        # пачки обрабатываются по очереди, чтобы не держать несколько транзакций
+        async with self._flush_lock:
+            await self._process(batch)
+
+    async def _process(self, batch: list[aio_pika.abc.AbstractIncomingMessage]):
+        parsed = []
+        for message in batch:
+            try:
+                parsed.append((message, self.parse(message)))
+            except Exception as e:
+                await self._dead_letter(message, e)
+
+        if not parsed:
+            return
+        try:
+            await self.handle_batch([item for _, item in parsed])
+        except Exception as e:
+            if self.is_transient(e):
+                logger.warning("Batch from %s failed, requeueing: %r", self.queue_name, e)
+                # пауза, чтобы не гонять пачку по кругу, пока база недоступна
+                await asyncio.sleep(self.retry_delay)
+                for message, _ in parsed:
+                    await message.nack(requeue=True)
+                return
+            logger.warning(
+                "Batch of %s messages from %s failed, retrying one by one",
+                len(parsed), self.queue_name, exc_info=True,
+            )
+            for message, item in parsed:
+                await self._process_one(message, item)
+            return
+
+        for message, _ in parsed:
+            await message.ack()
+
+    async def _process_one(self, message: aio_pika.abc.AbstractIncomingMessage, item):
+        try:
+            await self.handle_batch([item])
+        except Exception as e:
+            if self.is_transient(e):
+                await message.nack(requeue=True)
+            else:
+                await self._dead_letter(message, e)
+            return
+        await message.ack()
+
+    async def _dead_letter(self, message: aio_pika.abc.AbstractIncomingMessage, error: Exception):
+        logger.error("Moving message from %s to %s: %r", self.queue_name, self.dead_letter_queue, error)
+        await self.channel.default_exchange.publish(
+            aio_pika.Message(
+                body=message.body,
+                content_type=message.content_type,
+                message_id=message.message_id,
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                headers={
+                    **(message.headers or {}),
+                    "x-original-queue": self.queue_name,
+                    "x-error": repr(error)[:1000],
+                },
+            ),
+            routing_key=self.dead_letter_queue,
+        )
+        await message.ack()
+
+    async def start_consume(self):
+        """Запуск чтения из очереди."""
+        if not self.connection or not self.queue:
+            await self.connect()
+
+        await self.queue.consume(self.on_message)
+
+        await asyncio.Future()  # держим процесс живым
+
+    async def close(self):
+        """Закрытие соединения с RabbitMQ.
+
+        Неподтверждённые сообщения из незавершённой пачки брокер доставит снова.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self.connection:
+            await self.connection.close()
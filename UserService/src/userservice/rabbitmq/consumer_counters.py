@@ -0,0 +1,169 @@
+import json
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+import aio_pika
+from sqlalchemy import String, bindparam, delete, func, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+
+from ..settings import settings
+from ..counters import COUNTERS, CounterEvent, aggregate
+from ..database import sessionmaker
+from ..metrics import registry
+from ..models import ProcessedCounterEvent, User
+from .batch_consumer import BatchConsumer, PoisonMessage
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = (1, 10, 50, 100, 250, 500, 1000, 2500, 5000)
+
+counter_events = registry.counter(
+    "userservice_counter_events_total",
+    "События счётчиков: applied - применены, duplicate - уже были применены",
+    ("result",),
+)
+counter_rows_updated = registry.counter(
+    "userservice_counter_rows_updated_total",
+    "Строки user, обновлённые при записи счётчиков",
+)
+counter_flush_duration = registry.histogram(
+    "userservice_counter_flush_duration_seconds",
+    "Время записи пачки счётчиков в базу",
+)
+counter_flush_size = registry.histogram(
+    "userservice_counter_flush_events",
+    "Число событий в записанной пачке",
+    buckets=BATCH_SIZE_BUCKETS,
+)
+counter_last_flush = registry.gauge(
+    "userservice_counter_last_flush_timestamp_seconds",
+    "Время последней успешной записи счётчиков",
+)
+
+# отмечает новые id событий одним параметром-массивом и возвращает только их
+MARK_PROCESSED = (
+    insert(ProcessedCounterEvent)
+    .from_select(
+        ["event_id"],
+        select(func.unnest(bindparam("event_ids", type_=ARRAY(String)))),
+    )
+    .on_conflict_do_nothing()
+    .returning(ProcessedCounterEvent.event_id)
+)
+
+# x = x + delta: итог не зависит от того, что успели записать другие реплики
+UPDATE_COUNTERS = (
+    update(User.__table__)
+    .where(User.__table__.c.id == bindparam("b_id"))
+    .values({
+        name: func.coalesce(User.__table__.c[name], 0) + bindparam(f"d_{name}")
+        for name in COUNTERS
+    })
+)
+
+
+class RBC_COUNTERS(BatchConsumer):
+    """Пишет счётчики followers/followed/posts/collections пачками.
+
+    Сообщение: {"event_id", "user_id", "counter", "delta"}. Изменения пачки
+    складываются по (пользователь, счётчик), и каждый пользователь
+    обновляется одной строкой, поэтому сотня подписок на популярного
+    автора - одна блокировка его строки вместо сотни.
+
+    Доставка at-least-once: сообщения подтверждаются после коммита, а id
+    событий записываются в processed_counter_event в той же транзакции,
+    что и счётчики, так что повторно доставленное событие не применяется.
+    """
+
+    def __init__(
+        self,
+        amqp_url: str = settings.RBC_USER_AUTH_URL,
+        queue_name: str = settings.COUNTER_QUEUE,
+        batch_size: int = settings.COUNTER_MAX_PENDING,
+        batch_timeout_ms: float = settings.COUNTER_FLUSH_INTERVAL_MS,
+        prefetch: int = settings.COUNTER_MAX_PENDING,
+        dead_letter_queue: str = settings.COUNTER_DEAD_LETTER_QUEUE,
+        retention_hours: float = settings.COUNTER_EVENT_RETENTION_HOURS,
+    ):
+        super().__init__(amqp_url, queue_name, batch_size, batch_timeout_ms, prefetch, dead_letter_queue)
+        self.retention = timedelta(hours=retention_hours)
+        self._last_cleanup = 0.0
+
+    def parse(self, message: aio_pika.abc.AbstractIncomingMessage) -> CounterEvent:
+        try:
+            data = json.loads(message.body.decode())
+            event = CounterEvent(
+                event_id=str(data.get("event_id") or message.message_id or ""),
+                user_id=int(data["user_id"]),
+                counter=data["counter"],
+                delta=int(data["delta"]),
+            )
+        except (ValueError, KeyError, TypeError) as e:
+            raise PoisonMessage(f"Invalid counter message: {e!r}") from e
+
+        if not event.event_id or len(event.event_id) > 64:
+            raise PoisonMessage("Counter event needs an event_id of at most 64 characters")
+        if event.counter not in COUNTERS:
+            raise PoisonMessage(f"Unknown counter: {event.counter!r}")
+        return event
+
+    async def handle_batch(self, events: list[CounterEvent]):
+        started = time.perf_counter()
+        unique: dict[str, CounterEvent] = {}
+        for event in events:
+            unique.setdefault(event.event_id, event)
+
+        async with sessionmaker() as db:
+            result = await db.execute(MARK_PROCESSED, {"event_ids": list(unique)})
+            fresh = set(result.scalars())
+            rows = aggregate([event for event_id, event in unique.items() if event_id in fresh])
+            if rows:
+                await db.execute(
+                    UPDATE_COUNTERS,
+                    [
+                        {"b_id": row["user_id"], **{f"d_{name}": row[name] for name in COUNTERS}}
+                        for row in rows
+                    ],
+                )
+            await db.commit()
+
+        counter_events.inc(len(fresh), result="applied")
+        counter_events.inc(len(events) - len(fresh), result="duplicate")
+        counter_rows_updated.inc(len(rows))
+        counter_flush_size.observe(len(events))
+        counter_flush_duration.observe(time.perf_counter() - started)
+        counter_last_flush.set(time.time())
+
+        try:
+            await self._cleanup()
+        except Exception:
+            # пачка уже записана, её нельзя повторять из-за уборки
+            logger.exception("Cleanup of processed counter events failed")
+
+    async def _cleanup(self):
+        """Раз в минуту удаляет id событий старше срока хранения."""
+        if time.monotonic() - self._last_cleanup < 60:
+            return
+        self._last_cleanup = time.monotonic()
+        async with sessionmaker() as db, db.begin():
+            await db.execute(
+                delete(ProcessedCounterEvent).where(
+                    ProcessedCounterEvent.processed_at < datetime.now(timezone.utc) - self.retention
+                )
+            )
+
+
+RBCCounters = RBC_COUNTERS()
+
+
+def collect_pending():
+    yield (
+        "userservice_counter_pending_events",
+        "gauge",
+        "События счётчиков, ожидающие записи",
+        [({}, RBCCounters.pending)],
+    )
+
+
+registry.add_collector(collect_pending)
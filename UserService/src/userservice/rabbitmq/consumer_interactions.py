@@ -0,0 +1,142 @@
+import json
+import time
+
+import aio_pika
+import numpy as np
+from sqlalchemy import select, update
+
+from ..settings import settings
+from ..database import sessionmaker
+from ..interests import EVENT_WEIGHTS, InteractionEvent, coalesce
+from ..metrics import registry
+from ..models import User
+from ..profiles import id_in
+from ..vectors import load_vectors
+from .batch_consumer import BatchConsumer, PoisonMessage
+
+VECTOR_DIM = 512
+LAG_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+
+interest_events = registry.counter(
+    "userservice_interest_events_total",
+    "События взаимодействия, учтённые в vector_of_interest",
+    ("type",),
+)
+interest_users_updated = registry.counter(
+    "userservice_interest_users_updated_total",
+    "Пользователи, чей vector_of_interest записан в базу",
+)
+interest_flush_duration = registry.histogram(
+    "userservice_interest_flush_duration_seconds",
+    "Время записи пачки событий в базу",
+)
+interest_lag = registry.histogram(
+    "userservice_interest_lag_seconds",
+    "Время от события до записи его в vector_of_interest",
+    buckets=LAG_BUCKETS,
+)
+interest_last_flush_max_lag = registry.gauge(
+    "userservice_interest_last_flush_max_lag_seconds",
+    "Наибольшая задержка события в последней записанной пачке",
+)
+
+
+class RBC_INTERACTIONS(BatchConsumer):
+    """Обновляет vector_of_interest по просмотрам, лайкам и сохранениям.
+
+    Сообщение: {"user_id", "type": view|like|save, "author_id" или "vector",
+    "ts"}. События пачки сворачиваются по пользователям (interests.coalesce),
+    и каждый пользователь обновляется одной строкой в общем UPDATE, а не на
+    каждое событие. Сообщения подтверждаются после коммита, поэтому при
+    падении пачка будет применена снова целиком.
+    """
+
+    def __init__(
+        self,
+        amqp_url: str = settings.RBC_USER_AUTH_URL,
+        queue_name: str = settings.INTEREST_QUEUE,
+        batch_size: int = settings.INTEREST_MAX_PENDING,
+        batch_timeout_ms: float = settings.INTEREST_FLUSH_INTERVAL_MS,
+        prefetch: int = settings.INTEREST_MAX_PENDING,
+        dead_letter_queue: str = settings.INTEREST_DEAD_LETTER_QUEUE,
+    ):
+        super().__init__(amqp_url, queue_name, batch_size, batch_timeout_ms, prefetch, dead_letter_queue)
+
+    def parse(self, message: aio_pika.abc.AbstractIncomingMessage) -> InteractionEvent:
+        try:
+            data = json.loads(message.body.decode())
+            ts = data.get("ts")
+            if ts is None:
+                ts = message.timestamp.timestamp() if message.timestamp else time.time()
+            event = InteractionEvent(
+                user_id=int(data["user_id"]),
+                type=data["type"],
+                ts=float(ts),
+                author_id=int(data["author_id"]) if data.get("author_id") is not None else None,
+                vector=[float(x) for x in data["vector"]] if data.get("vector") is not None else None,
+            )
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise PoisonMessage(f"Invalid interaction message: {e!r}") from e
+
+        if event.type not in EVENT_WEIGHTS:
+            raise PoisonMessage(f"Unknown interaction type: {event.type!r}")
+        if event.vector is None and event.author_id is None:
+            raise PoisonMessage("Interaction without author_id and vector")
+        if event.vector is not None and len(event.vector) != VECTOR_DIM:
+            raise PoisonMessage(f"Interaction vector must have {VECTOR_DIM} dimensions")
+        return event
+
+    async def handle_batch(self, events: list[InteractionEvent]):
+        started = time.perf_counter()
+        pending = coalesce(events)
+        author_ids = list({id for interest in pending.values() for id in interest.authors})
+
+        async with sessionmaker() as db:
+            # блокировки в порядке id, чтобы параллельные реплики не ловили взаимоблокировку
+            result = await db.execute(
+                select(User.id, User.vector_of_interest)
+                .where(id_in(list(pending)))
+                .order_by(User.id)
+                .with_for_update()
+            )
+            current = {row.id: row.vector_of_interest for row in result}
+            authors = await load_vectors(db, author_ids, ("self_vector",)) if author_ids else {}
+            author_vectors = {
+                id: np.asarray(vectors["self_vector"], dtype=np.float64)
+                for id, vectors in authors.items()
+                if vectors["self_vector"] is not None
+            }
+
+            updates = []
+            for user_id, vector in current.items():
+                new_vector = pending[user_id].apply(vector, author_vectors)
+                if new_vector is not None:
+                    updates.append({"id": user_id, "vector_of_interest": new_vector})
+            if updates:
+                await db.execute(update(User), updates)
+            await db.commit()
+
+        now = time.time()
+        lags = [max(0.0, now - event.ts) for event in events]
+        for lag in lags:
+            interest_lag.observe(lag)
+        interest_last_flush_max_lag.set(max(lags))
+        for event in events:
+            interest_events.inc(type=event.type)
+        interest_users_updated.inc(len(updates))
+        interest_flush_duration.observe(time.perf_counter() - started)
+
+
+RBCInteractions = RBC_INTERACTIONS()
+
+
+def collect_pending():
+    yield (
+        "userservice_interest_pending_events",
+        "gauge",
+        "События, ожидающие записи в vector_of_interest",
+        [({}, RBCInteractions.pending)],
+    )
+
+
+registry.add_collector(collect_pending)
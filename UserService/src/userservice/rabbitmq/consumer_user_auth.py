@@ -1,59 +1,43 @@
-import asyncio
-import aio_pika
 import json
+
+import aio_pika
+from sqlalchemy.dialects.postgresql import insert
+
 from ..settings import settings
 from ..database import sessionmaker
 from ..models import User
+from .batch_consumer import BatchConsumer, PoisonMessage
 
-class RBC_USER_AUTH:
-    def __init__(self, amqp_url: str = settings.RBC_USER_AUTH_URL, queue_name: str = "user_add"):
-        self.amqp_url = amqp_url
-        self.queue_name = queue_name
-        self.connection: aio_pika.RobustConnection | None = None
-        self.channel: aio_pika.abc.AbstractChannel | None = None
-        self.queue: aio_pika.abc.AbstractQueue | None = None
-
-    async def connect(self):
-
-        self.connection = await aio_pika.connect_robust(self.amqp_url)
-        self.channel = await self.connection.channel()
-        self.queue = await self.channel.declare_queue(self.queue_name, durable=True)
-
-    async def on_message(self, message: aio_pika.abc.AbstractIncomingMessage):
-
-        async with message.process():
-            try:
-                data = json.loads(message.body.decode())
-
-                user_id = data.get("id")
-                username = data.get("username")
-                name = data.get("name")
-                new_user = User(
-                    id = user_id,
-                    username = username,
-                    name = name
-                )
-                async with sessionmaker() as db:
-                    db.add(new_user)
-                    await db.commit()
-                    await db.refresh(new_user)
 
-            except Exception as e:
-                print(e)
+class RBC_USER_AUTH(BatchConsumer):
+    """Создаёт пользователей из событий регистрации AuthService.
 
-    async def start_consume(self):
-        """Запуск чтения из очереди."""
-        if not self.connection or not self.queue:
-            await self.connect()
+    Пачка вставляется одним INSERT ... ON CONFLICT DO NOTHING, поэтому
+    повторная доставка уже обработанного события ничего не меняет.
+    """
 
-        await self.queue.consume(self.on_message)
+    def __init__(
+        self,
+        amqp_url: str = settings.RBC_USER_AUTH_URL,
+        queue_name: str = "user_add",
+        batch_size: int = settings.RBC_USER_AUTH_BATCH_SIZE,
+        batch_timeout_ms: float = settings.RBC_USER_AUTH_BATCH_TIMEOUT_MS,
+        prefetch: int = settings.RBC_USER_AUTH_PREFETCH,
+        dead_letter_queue: str = settings.RBC_USER_AUTH_DEAD_LETTER_QUEUE,
+    ):
+        super().__init__(amqp_url, queue_name, batch_size, batch_timeout_ms, prefetch, dead_letter_queue)
 
-        await asyncio.Future()  # держим процесс живым
+    def parse(self, message: aio_pika.abc.AbstractIncomingMessage) -> dict:
+        try:
+            data = json.loads(message.body.decode())
+            return {"id": int(data["id"]), "username": data["username"], "name": data["name"]}
+        except (ValueError, KeyError, TypeError) as e:
+            raise PoisonMessage(f"Invalid user_add message: {e!r}") from e
 
-    async def close(self):
-        """Закрытие соединения с RabbitMQ."""
-        if self.connection:
-            await self.connection.close()
+    async def handle_batch(self, items: list[dict]):
+        async with sessionmaker() as db:
+            await db.execute(insert(User).on_conflict_do_nothing(), items)
+            await db.commit()
 
 
-RBCUserAuth = RBC_USER_AUTH()
\ No newline at end of file
+RBCUserAuth = RBC_USER_AUTH()
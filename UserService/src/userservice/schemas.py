@@ -1,5 +1,7 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+from .settings import settings
 
 class Profile(BaseModel):
     username: str
@@ -18,7 +20,7 @@ class Profile(BaseModel):
 
 class ProfileComment(BaseModel):
     name: str
-    avatar_url: str
+    avatar_url: Optional[str] = None
     verificated: bool
 
 class ProfileCard(BaseModel):
@@ -29,3 +31,27 @@ class ProfileCard(BaseModel):
     card_image1: Optional[str] = None
     card_image2: Optional[str] = None
     description: Optional[str] = None
+
+
+class ProfileIds(BaseModel):
+    ids: List[int] = Field(max_length=settings.PROFILE_BATCH_MAX_IDS)
+
+
+class UserVectors(BaseModel):
+    vector_of_interest: Optional[List[float]] = None
+    self_vector: Optional[List[float]] = None
+
+
+class SimilarUser(BaseModel):
+    id: int
+    username: str
+    name: str
+    avatar_url: Optional[str] = None
+    verificated: bool
+    distance: float
+
+
+class SimilarUsers(BaseModel):
+    items: List[SimilarUser]
+    limit: int
+    offset: int
@@ -18,6 +18,50 @@ class Settings(BaseSettings):
     RBC_USER_AUTH_PASSWORD: str
     RBC_USER_AUTH_HOST: str
     RBC_USER_AUTH_PORT: str
+    # пачка создаваемых пользователей: не больше BATCH_SIZE сообщений или
+    # BATCH_TIMEOUT_MS с первого сообщения; PREFETCH - не меньше BATCH_SIZE
+    RBC_USER_AUTH_BATCH_SIZE: int = 500
+    RBC_USER_AUTH_BATCH_TIMEOUT_MS: float = 50
+    RBC_USER_AUTH_PREFETCH: int = 1000
+    RBC_USER_AUTH_DEAD_LETTER_QUEUE: str = "user_add.dlq"
+
+    # максимум id в одном запросе к /profile/*/batch
+    PROFILE_BATCH_MAX_IDS: int = 500
+
+    # параметры hnsw индексов векторов (применяются при создании индекса)
+    VECTOR_INDEX_M: int = 16
+    VECTOR_INDEX_EF_CONSTRUCTION: int = 64
+    # похожие пользователи: ef_search по умолчанию и ограничения на запрос.
+    # ef_search не может быть меньше offset + limit, иначе индекс вернёт
+    # меньше строк, чем запрошено; pgvector допускает ef_search до 1000,
+    # поэтому MAX_OFFSET + MAX_LIMIT должно быть меньше 1000
+    SIMILAR_USERS_EF_SEARCH: int = 40
+    SIMILAR_USERS_MAX_EF_SEARCH: int = 1000
+    SIMILAR_USERS_MAX_LIMIT: int = 100
+    SIMILAR_USERS_MAX_OFFSET: int = 800
+
+    # обновление vector_of_interest по действиям пользователей (interests.py).
+    # события копятся не дольше FLUSH_INTERVAL_MS и не больше MAX_PENDING
+    # штук, затем пишутся одной транзакцией. DECAY - доля старого вектора
+    # после события веса 1; у события веса w она равна DECAY ** w
+    INTEREST_QUEUE: str = "user_interactions"
+    INTEREST_DEAD_LETTER_QUEUE: str = "user_interactions.dlq"
+    INTEREST_FLUSH_INTERVAL_MS: float = 2000
+    INTEREST_MAX_PENDING: int = 5000
+    INTEREST_DECAY: float = 0.95
+    INTEREST_WEIGHT_VIEW: float = 0.2
+    INTEREST_WEIGHT_LIKE: float = 1.0
+    INTEREST_WEIGHT_SAVE: float = 2.0
+
+    # счётчики followers/followed/posts/collections (counters.py): изменения
+    # копятся не дольше FLUSH_INTERVAL_MS и не больше MAX_PENDING событий,
+    # затем пишутся одним UPDATE на пользователя. id применённых событий
+    # хранятся EVENT_RETENTION_HOURS - дольше, чем брокер может передоставлять
+    COUNTER_QUEUE: str = "user_counters"
+    COUNTER_DEAD_LETTER_QUEUE: str = "user_counters.dlq"
+    COUNTER_FLUSH_INTERVAL_MS: float = 1000
+    COUNTER_MAX_PENDING: int = 2000
+    COUNTER_EVENT_RETENTION_HOURS: float = 72
 
     @property
     def DATABASE_URL_asyncpg(self):
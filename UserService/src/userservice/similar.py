@@ -0,0 +1,69 @@
+from enum import Enum
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import User
+from .vectors import load_vectors
+
+
+class SimilarKind(str, Enum):
+    """Какой вектор пользователя с каким вектором других сравнивается."""
+
+    creators = "creators"  # похожие авторы: self_vector -> self_vector
+    for_you = "for_you"    # авторы под интересы: vector_of_interest -> self_vector
+    taste = "taste"        # похожие интересы: vector_of_interest -> vector_of_interest
+
+
+SIMILAR_COLUMNS = {
+    SimilarKind.creators: ("self_vector", "self_vector"),
+    SimilarKind.for_you: ("vector_of_interest", "self_vector"),
+    SimilarKind.taste: ("vector_of_interest", "vector_of_interest"),
+}
+
+
+async def find_similar(
+    db: AsyncSession,
+    id: int,
+    kind: SimilarKind,
+    limit: int,
+    offset: int,
+    ef_search: int,
+) -> list[dict] | None:
+    """Ближайшие по косинусному расстоянию пользователи через hnsw индекс.
+
+    None - пользователя нет; пустой список - у него ещё нет нужного вектора.
+    ef_search действует только в текущей транзакции (SET LOCAL) и поднимается
+    до offset + limit + 1: индекс отдаёт не больше ef_search строк, а одну
+    из них занимает сам пользователь.
+    """
+    source, target = SIMILAR_COLUMNS[kind]
+    vectors = await load_vectors(db, [id], (source,))
+    if id not in vectors:
+        return None
+    vector = vectors[id][source]
+    if vector is None:
+        return []
+
+    await db.execute(
+        select(func.set_config("hnsw.ef_search", str(max(ef_search, offset + limit + 1)), True))
+    )
+    target_column = getattr(User, target)
+    distance = target_column.cosine_distance(vector)
+    result = await db.execute(
+        select(
+            User.id,
+            User.username,
+            User.name,
+            User.avatar_url,
+            User.verificated,
+            distance.label("distance"),
+        )
+        # строки без вектора в hnsw индекс не попадают, а при seq scan
+        # пришли бы с distance = NULL
+        .where(target_column.is_not(None), User.id != id)
+        .order_by(distance)
+        .limit(limit)
+        .offset(offset)
+    )
+    return [row._asdict() for row in result]
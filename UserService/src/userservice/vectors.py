@@ -0,0 +1,25 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import User
+from .profiles import id_in
+
+VECTOR_COLUMNS = ("vector_of_interest", "self_vector")
+
+
+async def load_vectors(db: AsyncSession, ids: list[int], columns: tuple[str, ...] = VECTOR_COLUMNS) -> dict[int, dict]:
+    """Векторы пользователей: {id: {колонка: list[float] | None}}.
+
+    Единственный путь чтения векторов: в модели они отложены (deferred)
+    и в обычные запросы к User не попадают.
+    """
+    result = await db.execute(
+        select(User.id, *(getattr(User, name) for name in columns)).where(id_in(ids))
+    )
+    return {
+        row.id: {
+            name: value.tolist() if value is not None else None
+            for name, value in zip(columns, row[1:])
+        }
+        for row in result
+    }